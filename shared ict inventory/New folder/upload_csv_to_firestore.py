@@ -1,8 +1,22 @@
 import os
 import sys
+import csv
+import json
+import time
+import queue
+import hashlib
+import argparse
+import threading
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# The typed purchase date / price copies are shared with the web app (inventory_types.py next to app.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_types import (TYPED_FIELD, IMPORT_HASH_FIELD, TYPED_COLUMNS, CSV_CHUNK_ROWS, with_typed_fields, typed_update,
+                             csv_header, is_blank_csv_row, coerce_csv_rows)
 
 def init_mongodb():
     """Initialize MongoDB connection"""
@@ -16,29 +30,199 @@ def init_mongodb():
         print(f"Error connecting to MongoDB: {e}")
         sys.exit(1)
 
-def upload_csv_to_mongodb(csv_path, collection_name='ict_inventory'):
-    """Upload CSV data to MongoDB"""
+def bump_inventory_version(db):
+    """Tell the web app the inventory changed so it stops serving cached exports"""
+    db["metadata"].update_one({"_id": "inventory"}, {"$inc": {"version": 1}}, upsert=True)
+
+def backfill_typed_fields(collection_name='ict_inventory', batch_size=1000):
+    """Add typed purchase date/price copies to documents imported before they existed"""
+    db = init_mongodb()
+    collection = db[collection_name]
+    collection.create_index(f"{TYPED_FIELD}.purchase_date")
+    collection.create_index(f"{TYPED_FIELD}.purchase_price")
+
+    projection = {column: 1 for column in TYPED_COLUMNS}
+    projection[TYPED_FIELD] = 1
+    operations = []
+    updated = 0
+    for doc in collection.find({}, projection, batch_size=batch_size):
+        typed = with_typed_fields({column: doc[column] for column in TYPED_COLUMNS if column in doc}).get(TYPED_FIELD)
+        if typed == doc.get(TYPED_FIELD):
+            continue
+        if typed:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {TYPED_FIELD: typed}}))
+        else:
+            # The text no longer parses, so drop the stale typed copy
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$unset": {TYPED_FIELD: ""}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    print(f"Backfilled typed fields on {updated} document(s)")
+    if updated:
+        bump_inventory_version(db)
+    return True
+
+def insert_batch(collection, records):
+    """Insert one batch with ordered=False; returns (inserted, failed) so one bad row doesn't abort the rest"""
+    try:
+        result = collection.insert_many(records, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        failed = len(e.details.get('writeErrors', []))
+        for error in e.details.get('writeErrors', [])[:5]:
+            print(f"  Row {error.get('index')} in batch failed: {error.get('errmsg')}")
+        return e.details.get('nInserted', len(records) - failed), failed
+
+def row_hash(record):
+    """Content hash of an imported row, used to skip rows that haven't changed since the last import"""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+MAX_KEY_PROBLEMS_SHOWN = 20
+
+def find_key_problems(csv_path, key_field, chunk_size=100000):
+    """Read only the key column and return (rows_without_key, duplicate_keys).
+
+    rows_without_key lists CSV row numbers (1 = first data row); duplicate_keys maps every
+    key that appears more than once to all of its row numbers.
+    """
+    first_rows = {}
+    duplicate_keys = {}
+    rows_without_key = []
+    row_number = 0
+    for chunk in pd.read_csv(csv_path, usecols=[key_field], chunksize=chunk_size):
+        for key in chunk[key_field]:
+            row_number += 1
+            if pd.isna(key):
+                rows_without_key.append(row_number)
+            elif key in first_rows:
+                duplicate_keys.setdefault(key, [first_rows[key]]).append(row_number)
+            else:
+                first_rows[key] = row_number
+    return rows_without_key, duplicate_keys
+
+def check_upsert_key(csv_path, key_field):
+    """Refuse an upsert unless every row has its own key_field value, printing the offending rows.
+
+    Upserting on a repeated key would merge distinct assets into one document (and flip between
+    them on every run), so the whole file is checked before anything is written.
+    """
+    try:
+        rows_without_key, duplicate_keys = find_key_problems(csv_path, key_field)
+    except ValueError:
+        print(f"Error: column '{key_field}' not found in {csv_path}")
+        return False
+    if rows_without_key:
+        shown = ', '.join(str(row) for row in rows_without_key[:MAX_KEY_PROBLEMS_SHOWN])
+        more = ', ...' if len(rows_without_key) > MAX_KEY_PROBLEMS_SHOWN else ''
+        print(f"Error: {len(rows_without_key)} row(s) have no '{key_field}' (CSV rows {shown}{more})")
+    if duplicate_keys:
+        print(f"Error: {len(duplicate_keys)} '{key_field}' value(s) appear on more than one row:")
+        for key, rows in list(duplicate_keys.items())[:MAX_KEY_PROBLEMS_SHOWN]:
+            print(f"  {key!r}: CSV rows {', '.join(str(row) for row in rows)}")
+        if len(duplicate_keys) > MAX_KEY_PROBLEMS_SHOWN:
+            print(f"  ... and {len(duplicate_keys) - MAX_KEY_PROBLEMS_SHOWN} more")
+    if rows_without_key or duplicate_keys:
+        print("Nothing was written: --upsert needs a column with a unique value on every row. "
+              "Fix the file or pick another key column.")
+        return False
+    return True
+
+def upsert_batch(collection, key_field, records):
+    """Upsert one batch keyed by key_field, skipping rows whose stored content hash is unchanged.
+
+    Every record must have a key_field value that is unique in the file (see check_upsert_key).
+    Returns (written, failed, unchanged). The hash is kept on the inventory document itself
+    (IMPORT_HASH_FIELD, hidden from the app), so a row deleted, edited or re-imported in the web
+    app since the last resync is always written again.
+    """
+    keyed_records = {record[key_field]: record for record in records}
+    stored_hashes = {
+        doc[key_field]: doc.get(IMPORT_HASH_FIELD)
+        for doc in collection.find({key_field: {"$in": list(keyed_records)}}, {key_field: 1, IMPORT_HASH_FIELD: 1})
+    }
+
+    operations = []
+    for key, record in keyed_records.items():
+        content_hash = row_hash(record)
+        if stored_hashes.get(key) == content_hash:
+            continue
+        # Same $set/$unset as the web app's edits, so typed values the new text no longer has are removed
+        operations.append(UpdateOne({key_field: key}, typed_update(record, import_hash=content_hash), upsert=True))
+    unchanged = len(keyed_records) - len(operations)
+
+    if not operations:
+        return 0, 0, unchanged
+    try:
+        collection.bulk_write(operations, ordered=False)
+        failed = 0
+    except BulkWriteError as e:
+        failed = len(e.details.get('writeErrors', []))
+        for error in e.details.get('writeErrors', [])[:5]:
+            print(f"  Row {error.get('index')} in batch failed: {error.get('errmsg')}")
+    return len(operations) - failed, failed, unchanged
+
+def upload_csv_to_mongodb(csv_path, collection_name='ict_inventory', chunk_size=CSV_CHUNK_ROWS, batch_size=1000, upsert_key=None):
+    """Upload CSV data to MongoDB, reading chunk_size rows at a time and writing batch_size rows per request.
+
+    With upsert_key (e.g. 'ID' or 'Serial Number') rows are upserted on that field instead of
+    inserted, so re-running an import doesn't duplicate the inventory, and unchanged rows are skipped.
+    The key column must hold a unique value on every row; otherwise nothing is written.
+    """
     try:
-        # Read CSV file
-        print(f"Reading CSV file: {csv_path}")
-        df = pd.read_csv(csv_path)
-        print(f"Found {len(df)} rows in CSV")
+        if upsert_key and not check_upsert_key(csv_path, upsert_key):
+            return False
+        print(f"Reading CSV file in chunks of {chunk_size} rows: {csv_path}")
+        reader = pd.read_csv(csv_path, chunksize=chunk_size)
         print("Initializing MongoDB connection...")
 
         # Initialize MongoDB
         db = init_mongodb()
         collection = db[collection_name]
+        if upsert_key:
+            print(f"Upserting on '{upsert_key}'")
+            collection.create_index(upsert_key)
+
+        rows_read = 0
+        total_inserted = 0
+        total_failed = 0
+        total_unchanged = 0
+        failed_batches = 0
+        start_time = time.perf_counter()
+        for chunk in reader:
+            # Convert this chunk of the DataFrame to a list of dictionaries
+            records = [with_typed_fields(record) for record in chunk.to_dict(orient='records')]
+            for i in range(0, len(records), batch_size):
+                batch = records[i:i + batch_size]
+                if upsert_key:
+                    inserted, failed, unchanged = upsert_batch(collection, upsert_key, batch)
+                    total_unchanged += unchanged
+                else:
+                    inserted, failed = insert_batch(collection, batch)
+                total_inserted += inserted
+                total_failed += failed
+                if failed:
+                    failed_batches += 1
+                    print(f"Batch starting at CSV row {rows_read + i + 1}: {failed} row(s) failed")
+            rows_read += len(records)
 
-        print("Converting data to MongoDB format...")
-        # Convert DataFrame to list of dictionaries
-        records = df.to_dict(orient='records')
+            elapsed = time.perf_counter() - start_time
+            rate = rows_read / elapsed if elapsed > 0 else 0
+            print(f"Processed {rows_read} rows, wrote {total_inserted} records ({rate:,.0f} rows/sec)")
 
-        # Insert records into MongoDB
-        print(f"Inserting {len(records)} records into MongoDB collection '{collection_name}'...")
-        result = collection.insert_many(records)
-        print(f"Successfully inserted {len(result.inserted_ids)} records into MongoDB")
+        elapsed = time.perf_counter() - start_time
+        rate = rows_read / elapsed if elapsed > 0 else 0
+        print(f"Successfully wrote {total_inserted} records into MongoDB collection '{collection_name}' "
+              f"in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+        if upsert_key:
+            print(f"Skipped {total_unchanged} unchanged row(s)")
+        if total_failed:
+            print(f"⚠ {total_failed} row(s) failed in {failed_batches} batch(es)")
+        if total_inserted:
+            bump_inventory_version(db)
 
-        return True
+        return total_failed == 0
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_path}' not found!")
         return False
@@ -47,8 +231,180 @@ def upload_csv_to_mongodb(csv_path, collection_name='ict_inventory'):
         print(traceback.format_exc())
         return False
 
+def parse_chunk(header, rows):
+    """Turn a chunk of raw CSV rows into the same documents pandas.read_csv gives (runs in a worker process)"""
+    return [with_typed_fields(record) for record in coerce_csv_rows(header, rows)]
+
+def mongo_writer(collection, upsert_key, batches, stats, stats_lock):
+    """Writer thread: take record batches off the queue until a None sentinel arrives"""
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        try:
+            if upsert_key:
+                written, failed, unchanged = upsert_batch(collection, upsert_key, batch)
+            else:
+                written, failed = insert_batch(collection, batch)
+                unchanged = 0
+        except Exception as e:
+            print(f"Error writing batch: {e}")
+            written, failed, unchanged = 0, len(batch), 0
+        with stats_lock:
+            stats['written'] += written
+            stats['failed'] += failed
+            stats['unchanged'] += unchanged
+
+def parallel_upload_csv_to_mongodb(csv_path, collection_name='ict_inventory', chunk_size=CSV_CHUNK_ROWS, batch_size=1000,
+                                   parse_workers=None, write_workers=4, queue_size=8, upsert_key=None):
+    """Pipelined CSV import: parse and clean chunks in a process pool, write batches from a thread pool.
+
+    The main thread splits the file into chunks of raw rows; parse_workers processes type each chunk
+    exactly like upload_csv_to_mongodb's pandas reader (same chunk_size, same documents); finished batches go through a bounded queue (queue_size) to write_workers threads,
+    so memory stays bounded while parsing and inserting overlap. With upsert_key the key column is
+    checked for blanks and duplicates first, as in upload_csv_to_mongodb.
+    """
+    try:
+        if upsert_key and not check_upsert_key(csv_path, upsert_key):
+            return False
+        parse_workers = parse_workers or os.cpu_count() or 1
+        print(f"Importing {csv_path} with {parse_workers} parser process(es) and {write_workers} writer thread(s)")
+
+        # Initialize MongoDB
+        db = init_mongodb()
+        collection = db[collection_name]
+        if upsert_key:
+            print(f"Upserting on '{upsert_key}'")
+            collection.create_index(upsert_key)
+
+        batches = queue.Queue(maxsize=queue_size)
+        stats = {'written': 0, 'failed': 0, 'unchanged': 0}
+        stats_lock = threading.Lock()
+        writers = [
+            threading.Thread(target=mongo_writer, args=(collection, upsert_key, batches, stats, stats_lock), daemon=True)
+            for _ in range(write_workers)
+        ]
+        for writer in writers:
+            writer.start()
+
+        def enqueue(records):
+            for i in range(0, len(records), batch_size):
+                batches.put(records[i:i + batch_size])  # blocks while the writers catch up
+
+        rows_read = 0
+        start_time = time.perf_counter()
+        try:
+            with open(csv_path, newline='', encoding='utf-8-sig') as csv_file, \
+                    ProcessPoolExecutor(max_workers=parse_workers) as parsers:
+                reader = csv.reader(csv_file)
+                header = csv_header(next(reader))
+                pending = []
+                chunk = []
+                for row in reader:
+                    if is_blank_csv_row(row):
+                        continue
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        pending.append(parsers.submit(parse_chunk, header, chunk))
+                        rows_read += len(chunk)
+                        chunk = []
+                        # Keep a bounded number of chunks in flight
+                        if len(pending) >= parse_workers * 2:
+                            enqueue(pending.pop(0).result())
+                if chunk:
+                    pending.append(parsers.submit(parse_chunk, header, chunk))
+                    rows_read += len(chunk)
+                for future in pending:
+                    enqueue(future.result())
+        finally:
+            for _ in writers:
+                batches.put(None)
+            for writer in writers:
+                writer.join()
+
+        elapsed = time.perf_counter() - start_time
+        rate = rows_read / elapsed if elapsed > 0 else 0
+        print(f"Processed {rows_read} rows end-to-end in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+        print(f"Successfully wrote {stats['written']} records into MongoDB collection '{collection_name}'")
+        if upsert_key:
+            print(f"Skipped {stats['unchanged']} unchanged row(s)")
+        if stats['failed']:
+            print(f"⚠ {stats['failed']} row(s) failed")
+        if stats['written']:
+            bump_inventory_version(db)
+
+        return stats['failed'] == 0
+    except FileNotFoundError:
+        print(f"Error: CSV file '{csv_path}' not found!")
+        return False
+    except Exception as e:
+        print(f"Error during upload: {str(e)}")
+        print(traceback.format_exc())
+        return False
+
+def upload_parquet_to_mongodb(parquet_path, collection_name='ict_inventory', columns=None, batch_size=10000):
+    """Upload a Parquet file (e.g. from /download?format=parquet) to MongoDB, one batch at a time.
+
+    The export's "_typed.*" columns are skipped: the typed copies are rebuilt from the text columns.
+    """
+    try:
+        import pyarrow.parquet as pq
+
+        print(f"Reading Parquet file: {parquet_path}")
+        parquet_file = pq.ParquetFile(parquet_path)
+        print(f"Found {parquet_file.metadata.num_rows} rows in {parquet_file.num_row_groups} row group(s)")
+        print("Initializing MongoDB connection...")
+
+        # Initialize MongoDB
+        db = init_mongodb()
+        collection = db[collection_name]
+
+        # Only the requested columns are read from disk
+        if columns is None:
+            columns = parquet_file.schema_arrow.names
+        columns = [column for column in columns if not column.startswith(f"{TYPED_FIELD}.")]
+        total_inserted = 0
+        total_failed = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            records = [with_typed_fields(record) for record in batch.to_pylist()]
+            if not records:
+                continue
+            inserted, failed = insert_batch(collection, records)
+            total_inserted += inserted
+            total_failed += failed
+            print(f"Inserted {total_inserted}/{parquet_file.metadata.num_rows} records")
+
+        print(f"Successfully inserted {total_inserted} records into MongoDB")
+        if total_failed:
+            print(f"⚠ {total_failed} row(s) failed")
+        if total_inserted:
+            bump_inventory_version(db)
+        return total_failed == 0
+    except ImportError:
+        print("Error: Parquet import requires the pyarrow package (pip install pyarrow)")
+        return False
+    except FileNotFoundError:
+        print(f"Error: Parquet file '{parquet_path}' not found!")
+        return False
+    except Exception as e:
+        print(f"Error during upload: {str(e)}")
+        print(traceback.format_exc())
+        return False
+
 if __name__ == "__main__":
-    CSV_FILE = "ICT Inventory.csv"
+    parser = argparse.ArgumentParser(description="Import a CSV or Parquet file into the MongoDB inventory")
+    parser.add_argument("file", nargs="?", default="ICT Inventory.csv", help="path to a .csv or .parquet file")
+    parser.add_argument("--upsert", metavar="KEY", help="upsert rows keyed by this column (e.g. 'Serial Number') instead of inserting; "
+                        "every row needs its own unique value in it")
+    parser.add_argument("--parallel", action="store_true", help="parse in a process pool and write from a thread pool")
+    parser.add_argument("--parsers", type=int, default=None, help="parser processes for --parallel (default: CPU count)")
+    parser.add_argument("--writers", type=int, default=4, help="writer threads for --parallel (default: 4)")
+    parser.add_argument("--backfill-typed", action="store_true", help="add typed purchase date/price copies to existing records and exit")
+    args = parser.parse_args()
+    CSV_FILE = args.file
+
+    if args.backfill_typed:
+        sys.exit(0 if backfill_typed_fields() else 1)
 
     if not os.path.exists(CSV_FILE):
         print(f"Error: {CSV_FILE} not found in the current directory!")
@@ -56,7 +412,13 @@ if __name__ == "__main__":
         print("Current directory:", os.getcwd())
         sys.exit(1)
 
-    success = upload_csv_to_mongodb(CSV_FILE)
+    if CSV_FILE.lower().endswith('.parquet'):
+        success = upload_parquet_to_mongodb(CSV_FILE)
+    elif args.parallel:
+        success = parallel_upload_csv_to_mongodb(CSV_FILE, parse_workers=args.parsers, write_workers=args.writers,
+                                                 upsert_key=args.upsert)
+    else:
+        success = upload_csv_to_mongodb(CSV_FILE, upsert_key=args.upsert)
     if not success:
         print("Upload failed!")
         sys.exit(1)
@@ -1,14 +1,59 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core import exceptions as google_exceptions
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import os
 import sys
+import time
+import random
+import threading
 import traceback
 
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 500
+# Upper bound on batches committed at the same time
+MAX_CONCURRENT_COMMITS = 8
+MAX_COMMIT_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 5.0
+
+# Errors that mean "too busy / contended, try again later"
+RETRYABLE_ERRORS = (
+    google_exceptions.Aborted,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+)
+
+class AdaptiveConcurrency:
+    """Limits in-flight commits; the limit grows by one on success and halves on contention"""
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max(1, max_limit // 2)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, contended):
+        with self.condition:
+            self.in_flight -= 1
+            if contended:
+                self.limit = max(1, self.limit // 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1)
+            self.condition.notify_all()
+
 def init_firestore():
     """Initialize Firestore with emulator settings"""
-    # Set Firestore emulator host
-    os.environ["FIRESTORE_EMULATOR_HOST"] = "localhost:8174"
+    # Use the local emulator unless another host is configured
+    os.environ.setdefault("FIRESTORE_EMULATOR_HOST", "localhost:8174")
     
     try:
         print("Attempting to initialize Firebase app...")
@@ -24,8 +69,32 @@ def init_firestore():
         print(traceback.format_exc())
         sys.exit(1)
 
-def upload_csv_to_firestore(csv_path, collection_name='ict_inventory'):
-    """Upload CSV data to Firestore"""
+def clean_record(record):
+    """Convert NaN to None so every value is JSON serializable"""
+    return {key: None if pd.isna(value) else value for key, value in record.items()}
+
+def commit_with_backoff(db, writes, limiter):
+    """Commit one batch, retrying contended commits with jittered exponential backoff"""
+    for attempt in range(1, MAX_COMMIT_ATTEMPTS + 1):
+        limiter.acquire()
+        contended = False
+        try:
+            batch = db.batch()
+            for doc_ref, record in writes:
+                batch.set(doc_ref, record)
+            batch.commit()
+            return len(writes)
+        except RETRYABLE_ERRORS as e:
+            contended = True
+            if attempt == MAX_COMMIT_ATTEMPTS:
+                raise
+            print(f"Batch contended ({type(e).__name__}), retry {attempt}/{MAX_COMMIT_ATTEMPTS - 1}")
+        finally:
+            limiter.release(contended)
+        time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)))
+
+def upload_csv_to_firestore(csv_path, collection_name='ict_inventory', max_concurrent_commits=MAX_CONCURRENT_COMMITS):
+    """Upload CSV data to Firestore, committing batches concurrently"""
     try:
         # Read CSV file
         print(f"Reading CSV file: {csv_path}")
@@ -46,49 +115,36 @@ def upload_csv_to_firestore(csv_path, collection_name='ict_inventory'):
         # Convert DataFrame to list of dictionaries
         records = df.to_dict(orient='records')
         
-        # Upload each record
-        batch_size = 500  # Firestore has a limit of 500 operations per batch
+        # Document ids are assigned up front so a retried batch overwrites rather than duplicates
+        batches = []
+        for i in range(0, len(records), BATCH_SIZE):
+            chunk = records[i:i + BATCH_SIZE]
+            batches.append([(collection_ref.document(), clean_record(record)) for record in chunk])
+
+        limiter = AdaptiveConcurrency(max_concurrent_commits)
         total_uploaded = 0
-        
-        for i in range(0, len(records), batch_size):
-            try:
-                batch = db.batch()
-                chunk = records[i:i + batch_size]
-                
-                for record in chunk:
-                    # Clean the data: convert NaN to None and ensure all values are JSON serializable
-                    clean_record = {}
-                    for key, value in record.items():
-                        if pd.isna(value):
-                            clean_record[key] = None
-                        else:
-                            clean_record[key] = value
-                    
-                    # Add to batch
-                    doc_ref = collection_ref.document()
-                    batch.set(doc_ref, clean_record)
-                
-                # Commit the batch
-                print(f"Committing batch of {len(chunk)} records...")
-                batch.commit()
-                total_uploaded += len(chunk)
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_concurrent_commits) as executor:
+            futures = [executor.submit(commit_with_backoff, db, writes, limiter) for writes in batches]
+            for future in as_completed(futures):
+                try:
+                    total_uploaded += future.result()
+                except Exception as e:
+                    print(f"Error uploading batch: {e}")
+                    print(traceback.format_exc())
+                    for pending in futures:
+                        pending.cancel()
+                    return False
                 print(f"Successfully uploaded {total_uploaded}/{len(records)} records")
-                
-                # Force a small delay to avoid overwhelming the emulator
-                import time
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Error uploading batch: {e}")
-                print(traceback.format_exc())
-                return False
 
+        elapsed = time.perf_counter() - start_time
+        rate = total_uploaded / elapsed if elapsed > 0 else 0
         print("\nUpload complete!")
-        print(f"Total records uploaded: {total_uploaded}")
+        print(f"Total records uploaded: {total_uploaded} in {elapsed:.1f}s ({rate:,.0f} records/sec)")
         
-        # Verify the upload
-        all_docs = collection_ref.stream()
-        doc_count = sum(1 for _ in all_docs)
+        # Verify the upload with a server-side count instead of streaming every document back
+        count_results = collection_ref.count().get()
+        doc_count = count_results[0][0].value
         print(f"\nVerification: {doc_count} documents found in Firestore collection")
         
         if doc_count == len(records):
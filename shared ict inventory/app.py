@@ -1,13 +1,28 @@
-from flask import Flask, render_template_string, request, jsonify, send_file, session, redirect, url_for, flash
+from flask import Flask, render_template_string, request, jsonify, send_file, session, redirect, url_for, flash, Response, stream_with_context, g
 import os
+import io
+import re
+import csv
 import warnings
-import requests
 import tempfile
-from openpyxl import __version__ as openpyxl_version
-from pymongo import MongoClient
+import datetime
+import hashlib
+import itertools
+import time
+import uuid
+import threading
+import secrets
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from pymongo import MongoClient, UpdateOne, ReplaceOne, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson import ObjectId
 import json
 from functools import wraps
+from inventory_types import (TYPED_FIELD, HIDDEN_PROJECTION, TYPED_COLUMNS, CSV_CHUNK_ROWS, with_typed_fields, typed_update, typed_range_conditions,
+                             csv_header, is_blank_csv_row, coerce_csv_rows)
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -17,10 +32,115 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "afrahkoum")
 MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME", "ict_inventory")
 
-mongo_client = MongoClient(MONGO_URI)
+# Connection pool settings; anything left unset keeps pymongo's default
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    "compressors": ("MONGO_COMPRESSORS", str),  # e.g. "zstd,zlib" (zstd needs the zstandard package)
+}
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Counts pool checkouts, wait times and failures for the /metrics endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiting = threading.local()
+        self.stats = {
+            "pools_created": 0,
+            "pools_cleared": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_open": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+        }
+
+    def _add(self, **deltas):
+        with self.lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _finish_wait(self):
+        # check-out events for one operation are published on the thread that performs it
+        started = getattr(self.waiting, 'started', None)
+        self.waiting.started = None
+        return time.monotonic() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        self._add(pools_created=1)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(pools_cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add(connections_created=1, connections_open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(connections_closed=1, connections_open=-1)
+
+    def connection_check_out_started(self, event):
+        self.waiting.started = time.monotonic()
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait()
+        timed_out = 1 if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT else 0
+        self._add(waiting=-1, checkout_failures=1, checkout_timeouts=timed_out)
+
+    def connection_checked_out(self, event):
+        waited = self._finish_wait()
+        with self.lock:
+            self.stats["waiting"] -= 1
+            self.stats["checked_out"] += 1
+            self.stats["checkouts"] += 1
+            self.stats["checkout_wait_seconds_total"] += waited
+            self.stats["checkout_wait_seconds_max"] = max(self.stats["checkout_wait_seconds_max"], waited)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+def mongo_client_options():
+    """MongoClient keyword arguments built from the MONGO_* pool settings"""
+    options = {}
+    for option, (env_name, convert) in MONGO_POOL_OPTIONS.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = convert(value)
+    return options
+
+pool_metrics = PoolMetricsListener()
+mongo_client = MongoClient(MONGO_URI, event_listeners=[pool_metrics], **mongo_client_options())
 mongo_db = mongo_client[MONGO_DB_NAME]
 mongo_collection = mongo_db[MONGO_COLLECTION_NAME]
 
+def ensure_inventory_indexes():
+    """Indexes behind server-side purchase date / price range queries"""
+    mongo_collection.create_index(f"{TYPED_FIELD}.purchase_date")
+    mongo_collection.create_index(f"{TYPED_FIELD}.purchase_price")
+
 # Simple user credentials (in production, use a proper database)
 USERS = {
     "admin": {"password": "admin123", "role": "admin", "hidden": True},
@@ -30,23 +150,232 @@ USERS = {
 # User management collection
 users_collection = mongo_db["users"]
 
-# Check connection to MongoDB
-try:
-    # Test the connection and print collection info
-    doc_count = mongo_collection.count_documents({})
-    print(f"Connected to MongoDB database '{MONGO_DB_NAME}', collection '{MONGO_COLLECTION_NAME}'")
-    print(f"Total documents in collection: {doc_count}")
-    
-    # Print first few documents for debugging
-    if doc_count > 0:
-        sample_docs = list(mongo_collection.find({}, {"_id": 0}).limit(3))
-        print("Sample documents:")
-        for i, doc in enumerate(sample_docs, 1):
-            print(f"  Document {i}: {doc}")
-    else:
-        print("No documents found in the collection")
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
+# In-process cache of users and their permissions (never passwords), so permission changes
+# apply on the next request without reloading every user. Every user write bumps a version
+# counter in the metadata collection; each request compares it (one small _id lookup) so
+# changes made on any worker take effect immediately everywhere.
+user_directory = {}
+user_directory_version = None
+user_directory_lock = threading.Lock()
+
+def ensure_user_indexes():
+    """Usernames are unique; the index also serves login lookups"""
+    users_collection.create_index("username", unique=True)
+
+def directory_entry(user):
+    """The cached part of a user document"""
+    return {
+        'role': user.get('role', 'user'),
+        'location_permissions': user.get('location_permissions', {}),
+        'column_permissions': user.get('column_permissions', []),
+    }
+
+def get_users_version():
+    """Return the user directory version counter (bumped on every user write)"""
+    doc = metadata_collection.find_one({"_id": "users"})
+    return doc.get('version', 0) if doc else 0
+
+def bump_users_version():
+    """Mark the user directory as changed so every worker reloads it on its next request"""
+    metadata_collection.update_one({"_id": "users"}, {"$inc": {"version": 1}}, upsert=True)
+
+def get_directory_user(username):
+    """Return the cached {'role', 'location_permissions', 'column_permissions'} for a MongoDB user"""
+    global user_directory, user_directory_version
+    version = get_users_version()
+    with user_directory_lock:
+        if version != user_directory_version:
+            user_directory = {user['username']: directory_entry(user) for user in users_collection.find({}, {"password": 0})}
+            user_directory_version = version
+        if username in user_directory:
+            return user_directory[username]
+    # Users inserted straight into the database don't bump the version, so confirm a miss
+    user = users_collection.find_one({"username": username}, {"password": 0})
+    if user is None:
+        return None
+    with user_directory_lock:
+        if user_directory_version == version:
+            user_directory[username] = directory_entry(user)
+    return directory_entry(user)
+
+# Bookkeeping such as the inventory version counter used to key cached exports
+metadata_collection = mongo_db["metadata"]
+location_catalogue_collection = mongo_db["location_catalogue"]
+
+# Export/import jobs run on a thread inside one worker process; their state is mirrored here so
+# status polls answered by another worker (serve.py runs several) still find them
+jobs_collection = mongo_db["jobs"]
+JOB_PUBLISH_INTERVAL_SECONDS = 1.0
+JOB_RETENTION_SECONDS = 60 * 60
+
+def ensure_job_indexes():
+    """Let MongoDB expire mirrored jobs on its own"""
+    jobs_collection.create_index("updated_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+# Server-side sessions: the cookie only carries a random session id and the session data
+# lives in a local SQLite file shared by all worker processes
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(tempfile.gettempdir(), "ict_inventory_sessions.sqlite3"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 60 * 60)))
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced_sid = None
+
+    def regenerate(self):
+        """Move the session to a fresh id (on login/logout) so a previously known id can't be reused"""
+        if self.replaced_sid is None and not self.new:
+            self.replaced_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+class SQLiteSessionInterface(SessionInterface):
+    """Stores sessions in SQLite with idle expiry; expired rows are evicted as new sessions start"""
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self.local.conn = conn
+        return conn
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self._connect().execute(
+                "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, time.time())
+            ).fetchone()
+            if row:
+                session_obj = ServerSideSession(json.loads(row[0]), sid=sid)
+                # Only touch the row again once half the idle timeout has passed
+                session_obj.refresh = row[1] - time.time() < self.ttl_seconds / 2
+                return session_obj
+        session_obj = ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+        session_obj.refresh = False
+        return session_obj
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        conn = self._connect()
+
+        if session.replaced_sid:
+            with conn:
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (session.replaced_sid,))
+
+        if not session:
+            if not session.new or session.replaced_sid:
+                with conn:
+                    conn.execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        if not (session.modified or session.refresh):
+            return
+
+        expires = time.time() + self.ttl_seconds
+        with conn:
+            if session.new:
+                conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+                (session.sid, json.dumps(dict(session)), expires)
+            )
+        response.set_cookie(
+            cookie_name,
+            session.sid,
+            max_age=self.ttl_seconds,
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path
+        )
+
+app.session_interface = SQLiteSessionInterface(SESSION_DB_PATH, SESSION_TTL_SECONDS)
+
+# MongoDB is checked from a background thread so importing the app never waits on the
+# database: the first successful ping also creates the indexes, and /readyz reports the
+# latest result without blocking
+MONGO_CHECK_INTERVAL_SECONDS = int(os.getenv("MONGO_CHECK_INTERVAL_SECONDS", "15"))
+mongo_status = {"ready": False, "indexes": False, "error": "Not checked yet", "index_error": None, "checked_at": None}
+
+def check_mongo():
+    """Ping MongoDB and record the result; readiness depends on the ping alone"""
+    try:
+        mongo_client.admin.command('ping')
+        if not mongo_status['ready']:
+            print(f"Connected to MongoDB database '{MONGO_DB_NAME}', collection '{MONGO_COLLECTION_NAME}'")
+        mongo_status['ready'] = True
+        mongo_status['error'] = None
+    except Exception as e:
+        if mongo_status['ready'] or mongo_status['checked_at'] is None:
+            print(f"Error connecting to MongoDB: {e}")
+        mongo_status['ready'] = False
+        mongo_status['error'] = str(e)
+    mongo_status['checked_at'] = time.time()
+
+    # Index creation is retried on every check until it succeeds, without affecting readiness
+    if mongo_status['ready'] and not mongo_status['indexes']:
+        try:
+            ensure_inventory_indexes()
+            ensure_user_indexes()
+            ensure_job_indexes()
+            mongo_status['indexes'] = True
+            mongo_status['index_error'] = None
+        except Exception as e:
+            if mongo_status['index_error'] != str(e):
+                print(f"Error creating MongoDB indexes: {e}")
+            mongo_status['index_error'] = str(e)
+
+def monitor_mongo():
+    """Keep mongo_status current for /readyz"""
+    while True:
+        check_mongo()
+        time.sleep(MONGO_CHECK_INTERVAL_SECONDS)
+
+threading.Thread(target=monitor_mongo, name="mongo-monitor", daemon=True).start()
+
+def resolve_user_access(username, builtin):
+    """Return {'role', 'location_permissions', 'column_permissions'} for a logged-in user, or None if they no longer exist"""
+    if builtin and username in USERS:
+        # No restrictions for hardcoded users
+        return {'role': USERS[username]['role'], 'location_permissions': {}, 'column_permissions': []}
+    return get_directory_user(username)
+
+@app.before_request
+def load_current_user():
+    """Resolve the logged-in user's role and permissions for this request"""
+    g.role = None
+    g.location_permissions = {}
+    g.column_permissions = []
+    username = session.get('username')
+    if not username:
+        return
+    user = resolve_user_access(username, session.get('builtin', username in USERS))
+    if user is None:
+        # The account was deleted or renamed since login
+        session.clear()
+        return
+    g.role = user['role']
+    g.location_permissions = user['location_permissions']
+    g.column_permissions = user['column_permissions']
 
 # Authentication decorators
 def login_required(f):
@@ -60,7 +389,7 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'username' not in session or session.get('role') != 'admin':
+        if 'username' not in session or g.role != 'admin':
             flash('Admin access required')
             return redirect(url_for('user_dashboard'))
         return f(*args, **kwargs)
@@ -74,10 +403,9 @@ def login():
         
         # Check hardcoded users first (admin/user)
         if username in USERS and USERS[username]['password'] == password:
+            session.regenerate()
             session['username'] = username
-            session['role'] = USERS[username]['role']
-            session['location_permissions'] = {}  # No restrictions for hardcoded users
-            session['column_permissions'] = []  # No column restrictions for hardcoded users
+            session['builtin'] = True
             
             if USERS[username]['role'] == 'admin':
                 return redirect(url_for('admin_dashboard'))
@@ -87,10 +415,10 @@ def login():
             # Check MongoDB users
             user = users_collection.find_one({"username": username, "password": password})
             if user:
+                # Role and permissions are looked up per request from the user directory
+                session.regenerate()
                 session['username'] = username
-                session['role'] = user['role']
-                session['location_permissions'] = user.get('location_permissions', {})
-                session['column_permissions'] = user.get('column_permissions', [])
+                session['builtin'] = False
                 
                 if user['role'] == 'admin':
                     return redirect(url_for('admin_dashboard'))
@@ -228,9 +556,27 @@ def login():
         </html>
     ''')
 
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: MongoDB answered the background monitor's last ping"""
+    if mongo_status['ready']:
+        return jsonify({
+            "status": "ready",
+            "indexes": mongo_status['indexes'],
+            "index_error": mongo_status['index_error'],
+            "checked_at": mongo_status['checked_at'],
+        })
+    return jsonify({"status": "unavailable", "error": mongo_status['error'], "checked_at": mongo_status['checked_at']}), 503
+
 @app.route('/logout')
 def logout():
     session.clear()
+    session.regenerate()
     flash('You have been logged out')
     return redirect(url_for('login'))
 
@@ -239,7 +585,7 @@ def index():
     if 'username' not in session:
         return redirect(url_for('login'))
     
-    if session.get('role') == 'admin':
+    if g.role == 'admin':
         return redirect(url_for('admin_dashboard'))
     else:
         return redirect(url_for('user_dashboard'))
@@ -250,7 +596,7 @@ def index():
 def admin_dashboard():
     try:
         # Fetch all documents from MongoDB
-        data = list(mongo_collection.find({}, {"_id": 0}))
+        data = list(mongo_collection.find({}, {"_id": 0, **HIDDEN_PROJECTION}))
         if not data:
             raise Exception("No data found in MongoDB collection 'ict_inventory'.")
         # Create a mapping of display names to safe names
@@ -262,9 +608,7 @@ def admin_dashboard():
         for row in data:
             for orig, safe in column_mapping.items():
                 row[safe] = row.pop(orig)
-        # Create DataFrame for shape
-        import pandas as pd
-        df = pd.DataFrame(data)
+        shape = (len(data), len(original_columns))
     except Exception as e:
         import traceback
         error_message = str(e)
@@ -289,7 +633,6 @@ def admin_dashboard():
     # Create enumerated columns for the template
     columns_list = original_columns  # Use original column names for display
     enumerated_columns = list(enumerate(columns_list))
-    shape = df.shape
     username = session.get('username', 'Admin')
     return render_template_string('''
         <!DOCTYPE html>
@@ -679,9 +1022,18 @@ def admin_dashboard():
                             <a href="{{ url_for('manage_users') }}" class="btn btn-info">
                                 <i class="fas fa-users mr-2"></i>Manage Users
                             </a>
-                            <a href="{{ url_for('download') }}" class="btn btn-success">
+                            <a href="{{ url_for('import_page') }}" class="btn btn-info">
+                                <i class="fas fa-file-import mr-2"></i>Import Data
+                            </a>
+                            <a href="{{ url_for('download') }}" class="btn btn-success export-link" data-format="csv">
                                 <i class="fas fa-download mr-2"></i>Download CSV
                             </a>
+                            <a href="{{ url_for('download', format='xlsx') }}" class="btn btn-success export-link" data-format="xlsx">
+                                <i class="fas fa-file-excel mr-2"></i>Download Excel
+                            </a>
+                            <a href="{{ url_for('download', format='parquet') }}" class="btn btn-success export-link" data-format="parquet">
+                                <i class="fas fa-database mr-2"></i>Download Parquet
+                            </a>
                             <div class="float-right">
                                 <span class="text-muted">
                                     <i class="fas fa-info-circle mr-1"></i>
@@ -717,6 +1069,7 @@ def admin_dashboard():
             <script src="https://cdn.datatables.net/1.13.4/js/jquery.dataTables.min.js"></script>
             <script src="https://cdn.datatables.net/fixedheader/3.4.0/js/dataTables.fixedHeader.min.js"></script>
             <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
+            <script src="{{ url_for('export_script') }}"></script>
             <script>
             let table;
             let columns = {{ columns_list|tojson }};
@@ -724,6 +1077,10 @@ def admin_dashboard():
             let selectedRows = new Set();
             let columnFilters = {};
             let allData = [];
+            let pendingEdits = [];
+            let editFlushTimer = null;
+            let editFlushInFlight = false;
+            const EDIT_FLUSH_INTERVAL = 1500;
             
             $(document).ready(function() {
                 // Initialize DataTable
@@ -845,6 +1202,12 @@ def admin_dashboard():
                     $('#selectAllCheckbox').prop('checked', false).trigger('change');
                 });
 
+                // Export only what the grid currently shows
+                $('.export-link').click(function(e) {
+                    e.preventDefault();
+                    startExport($(this), exportParams(table, columns, columnFilters, $(this).data('format'), 1));
+                });
+
                 // Individual delete button
                 $('#excelTable').on('click', '.delete-btn', function() {
                     const recordId = $(this).data('id');
@@ -860,6 +1223,15 @@ def admin_dashboard():
                     }
                 });
 
+                // Send any buffered edits before the page goes away
+                $(window).on('beforeunload', function() {
+                    if (pendingEdits.length > 0) {
+                        const payload = new Blob([JSON.stringify({edits: pendingEdits})], {type: 'application/json'});
+                        navigator.sendBeacon('/records/edit', payload);
+                        pendingEdits = [];
+                    }
+                });
+
                 // Keyboard shortcuts
                 $(document).on('keydown', function(e) {
                     if (editingCell) {
@@ -1072,16 +1444,37 @@ def admin_dashboard():
             }
 
             function saveCellChange(recordId, columnName, newValue) {
-                const data = {};
-                data[columnName] = newValue;
+                // Queue the edit; buffered edits are sent together by flushCellEdits()
+                pendingEdits.push({id: recordId, column: columnName, value: newValue});
+                if (!editFlushTimer) {
+                    editFlushTimer = setTimeout(flushCellEdits, EDIT_FLUSH_INTERVAL);
+                }
+            }
+
+            function flushCellEdits() {
+                editFlushTimer = null;
+                // One request at a time so responses can't land out of order;
+                // edits queued in the meantime go out when it completes
+                if (editFlushInFlight || pendingEdits.length === 0) return;
+
+                const edits = pendingEdits;
+                pendingEdits = [];
+                editFlushInFlight = true;
 
                 $.ajax({
-                    url: '/edit/' + recordId,
+                    url: '/records/edit',
                     method: 'POST',
                     contentType: 'application/json',
-                    data: JSON.stringify(data),
+                    data: JSON.stringify({edits: edits}),
                     success: function(response) {
                         if (response.success) {
+                            response.records.forEach(record => {
+                                // Don't clobber a cell that is being edited right now
+                                if (!editingCell || editingCell.data('id') !== record.record_id) {
+                                    patchRow(withPendingEdits(record));
+                                }
+                            });
+                            table.draw(false);
                             showSaveIndicator();
                         } else {
                             alert('Error saving: ' + response.message);
@@ -1091,8 +1484,53 @@ def admin_dashboard():
                     error: function() {
                         alert('Error saving changes');
                         table.ajax.reload();
+                    },
+                    complete: function() {
+                        editFlushInFlight = false;
+                        if (pendingEdits.length > 0 && !editFlushTimer) {
+                            editFlushTimer = setTimeout(flushCellEdits, EDIT_FLUSH_INTERVAL);
+                        }
+                    }
+                });
+            }
+
+            function withPendingEdits(record) {
+                // The server's copy predates edits still waiting to be sent; keep what the user typed
+                pendingEdits.forEach(edit => {
+                    const columnIndex = columns.indexOf(edit.column);
+                    if (edit.id === record.record_id && columnIndex !== -1) {
+                        record['col_' + columnIndex] = edit.value;
                     }
                 });
+                return record;
+            }
+
+            function findRow(recordId) {
+                return table.row(function(idx, data) {
+                    return data.record_id === recordId;
+                });
+            }
+
+            function patchRow(record) {
+                const row = findRow(record.record_id);
+                if (row.any()) {
+                    row.data(record).invalidate();
+                }
+                const rowIndex = allData.findIndex(r => r.record_id === record.record_id);
+                if (rowIndex !== -1) {
+                    allData[rowIndex] = record;
+                }
+            }
+
+            function addRows(records) {
+                table.rows.add(records).draw(false);
+                allData.push(...records);
+            }
+
+            function removeRow(recordId) {
+                findRow(recordId).remove();
+                allData = allData.filter(r => r.record_id !== recordId);
+                selectedRows.delete(recordId);
             }
 
             function addNewRow() {
@@ -1108,7 +1546,7 @@ def admin_dashboard():
                     data: JSON.stringify(newData),
                     success: function(response) {
                         if (response.success) {
-                            table.ajax.reload();
+                            addRows([response.record]);
                             showSaveIndicator();
                         } else {
                             alert('Error adding row: ' + response.message);
@@ -1123,36 +1561,24 @@ def admin_dashboard():
             function copySelectedRows() {
                 if (selectedRows.size === 0) return;
 
-                const selectedData = [];
-                $('.row-select:checked').each(function() {
-                    const row = table.row($(this).closest('tr')).data();
-                    const rowData = {};
-                    columns.forEach((col, index) => {
-                        rowData[col] = row['col_' + index] || '';
-                    });
-                    selectedData.push(rowData);
-                });
-
-                let completed = 0;
-                selectedData.forEach(rowData => {
-                    $.ajax({
-                        url: '/add',
-                        method: 'POST',
-                        contentType: 'application/json',
-                        data: JSON.stringify(rowData),
-                        success: function(response) {
-                            completed++;
-                            if (completed === selectedData.length) {
-                                table.ajax.reload();
-                                clearSelection();
-                                showSaveIndicator();
-                                alert(selectedData.length + ' row(s) copied successfully!');
-                            }
-                        },
-                        error: function() {
-                            alert('Error copying rows');
+                $.ajax({
+                    url: '/records/duplicate',
+                    method: 'POST',
+                    contentType: 'application/json',
+                    data: JSON.stringify({ids: Array.from(selectedRows)}),
+                    success: function(response) {
+                        if (response.success) {
+                            addRows(response.records);
+                            clearSelection();
+                            showSaveIndicator();
+                            alert(response.ids.length + ' row(s) copied successfully!');
+                        } else {
+                            alert('Error copying rows: ' + response.message);
                         }
-                    });
+                    },
+                    error: function() {
+                        alert('Error copying rows');
+                    }
                 });
             }
 
@@ -1166,14 +1592,15 @@ def admin_dashboard():
                 let completed = 0;
                 const totalRows = selectedRows.size;
                 
-                selectedRows.forEach(recordId => {
+                Array.from(selectedRows).forEach(recordId => {
                     $.ajax({
                         url: '/delete/' + recordId,
                         method: 'DELETE',
                         success: function(response) {
                             completed++;
+                            removeRow(recordId);
                             if (completed === totalRows) {
-                                table.ajax.reload();
+                                table.draw(false);
                                 clearSelection();
                                 showSaveIndicator();
                                 alert(totalRows + ' row(s) deleted successfully!');
@@ -1192,7 +1619,9 @@ def admin_dashboard():
                     method: 'DELETE',
                     success: function(response) {
                         if (response.success) {
-                            table.ajax.reload();
+                            removeRow(recordId);
+                            table.draw(false);
+                            updateSelectionUI();
                             showSaveIndicator();
                         } else {
                             alert('Error: ' + response.message);
@@ -1244,16 +1673,16 @@ def admin_dashboard():
 def user_dashboard():
     try:
         # Fetch all documents from MongoDB
-        data = list(mongo_collection.find({}, {"_id": 0}))
+        data = list(mongo_collection.find({}, {"_id": 0, **HIDDEN_PROJECTION}))
         if not data:
             raise Exception("No data found in MongoDB collection 'ict_inventory'.")
         
         # Apply column permissions for users
         all_columns = [str(col).strip() for col in data[0].keys()]
-        column_permissions = session.get('column_permissions', [])
+        column_permissions = g.column_permissions
         
         # If user has column permissions, filter columns
-        if column_permissions and session.get('role') != 'admin':
+        if column_permissions and g.role != 'admin':
             original_columns = [col for col in all_columns if col in column_permissions]
             # Filter data to only include allowed columns
             filtered_data = []
@@ -1273,9 +1702,7 @@ def user_dashboard():
             for orig, safe in column_mapping.items():
                 if orig in row:
                     row[safe] = row.pop(orig)
-        # Create DataFrame for shape
-        import pandas as pd
-        df = pd.DataFrame(data)
+        shape = (len(data), len(original_columns))
     except Exception as e:
         import traceback
         error_message = str(e)
@@ -1300,7 +1727,6 @@ def user_dashboard():
     # Create enumerated columns for the template
     columns_list = original_columns  # Use original column names for display
     enumerated_columns = list(enumerate(columns_list))
-    shape = df.shape
     username = session.get('username', 'User')
     return render_template_string('''
         <!DOCTYPE html>
@@ -1677,7 +2103,16 @@ def user_dashboard():
                             <button class="btn btn-warning" id="clearFiltersBtn">
                                 <i class="fas fa-filter mr-2"></i>Clear All Filters
                             </button>
-                                                        <div class="float-right">
+                            <a href="{{ url_for('download') }}" class="btn btn-success export-link" data-format="csv">
+                                <i class="fas fa-download mr-2"></i>Download CSV
+                            </a>
+                            <a href="{{ url_for('download', format='xlsx') }}" class="btn btn-success export-link" data-format="xlsx">
+                                <i class="fas fa-file-excel mr-2"></i>Download Excel
+                            </a>
+                            <a href="{{ url_for('download', format='parquet') }}" class="btn btn-success export-link" data-format="parquet">
+                                <i class="fas fa-database mr-2"></i>Download Parquet
+                            </a>
+                            <div class="float-right">
                                 <span class="text-muted">
                                     <i class="fas fa-info-circle mr-1"></i>
                                     Use dropdown filters to search data • Download available
@@ -1712,6 +2147,7 @@ def user_dashboard():
             <script src="https://cdn.datatables.net/1.13.4/js/jquery.dataTables.min.js"></script>
             <script src="https://cdn.datatables.net/fixedheader/3.4.0/js/dataTables.fixedHeader.min.js"></script>
             <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
+            <script src="{{ url_for('export_script') }}"></script>
             <script>
             let table;
             let columns = {{ columns_list|tojson }};
@@ -1771,6 +2207,12 @@ def user_dashboard():
                 $('#clearFiltersBtn').click(function() {
                     clearAllFilters();
                 });
+
+                // Export only what the grid currently shows
+                $('.export-link').click(function(e) {
+                    e.preventDefault();
+                    startExport($(this), exportParams(table, columns, columnFilters, $(this).data('format'), 0));
+                });
             });
 
             function createFilterRow() {
@@ -1880,122 +2322,151 @@ def user_dashboard():
         </html>
     ''', columns_list=columns_list, enumerated_columns=enumerated_columns, shape=shape, username=username)
 
-@app.route('/data', methods=['POST'])
-@login_required
-def data():
-    try:
-        # Get form data from request
-        req = request.form
-        print("Received data request:", req)
+def get_grid_columns():
+    """Return the caller's grid columns in the same order /data uses for col_i"""
+    sample_doc = mongo_collection.find_one({}, {"_id": 0, **HIDDEN_PROJECTION})
+    if not sample_doc:
+        return []
+    all_columns = [str(col).strip() for col in sample_doc.keys()]
+    column_permissions = g.column_permissions
+    if column_permissions and g.role != 'admin':
+        return [col for col in all_columns if col in column_permissions]
+    return all_columns
 
-        # Build query based on user permissions
-        query = {}
-        location_permissions = session.get('location_permissions', {})
-        
-        # Apply location-based filtering for users with permissions
-        if location_permissions and session.get('role') != 'admin':
-            or_conditions = []
-            for column, allowed_values in location_permissions.items():
-                if allowed_values:  # Only add condition if there are allowed values
-                    or_conditions.append({column: {"$in": allowed_values}})
-            
-            if or_conditions:
-                query = {"$or": or_conditions}
+def to_grid_row(doc, columns):
+    """Convert a MongoDB document into a DataTables row using the col_i layout"""
+    row = {'record_id': str(doc['_id'])}
+    for i, col in enumerate(columns):
+        row[f"col_{i}"] = clean_value(doc.get(col, ''))
+    return row
 
-        # Fetch documents from MongoDB based on query
-        if session.get('role') == 'admin':
-            data_list = list(mongo_collection.find(query))
-        else:
-            data_list = list(mongo_collection.find(query, {"_id": 0}))
-            
-        if not data_list:
-            return jsonify({
-                'draw': int(req.get('draw', 1)),
-                'recordsTotal': 0,
-                'recordsFiltered': 0,
-                'data': []
-            })
+def build_permission_query():
+    """Return the MongoDB filter limiting non-admin users to their permitted locations"""
+    location_permissions = g.location_permissions
+    if not location_permissions or g.role == 'admin':
+        return {}
+    or_conditions = []
+    for column, allowed_values in location_permissions.items():
+        if allowed_values:  # Only add condition if there are allowed values
+            or_conditions.append({column: {"$in": allowed_values}})
+    if or_conditions:
+        return {"$or": or_conditions}
+    return {}
 
-        # Create safe column names (exclude _id from display columns for users)
-        if session.get('role') == 'admin':
-            original_columns = [str(col).strip() for col in data_list[0].keys() if col != '_id']
-            safe_columns = [f"col_{i}" for i in range(len(original_columns))]
-            column_mapping = dict(zip(original_columns, safe_columns))
-            
-            # Convert data to safe columns and add record_id for admin
-            for row in data_list:
-                row['record_id'] = str(row['_id'])
-                del row['_id']
-                for orig, safe in column_mapping.items():
-                    if orig in row:
-                        row[safe] = row.pop(orig)
+def build_data_query(params):
+    """The grid's query: the caller's permissions plus any purchase date / price range parameters"""
+    conditions = [condition for condition in [build_permission_query()] if condition]
+    conditions.extend(typed_range_conditions(params))
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def clean_value(value):
+    """Blank out None and NaN (left behind by the CSV import) so values serialize cleanly"""
+    if value is None or value != value:
+        return ''
+    return value
+
+def fetch_data_documents(query):
+    """Documents behind the dashboard grid; admins also get _id so rows can be edited"""
+    if g.role == 'admin':
+        return list(mongo_collection.find(query, HIDDEN_PROJECTION))
+    return list(mongo_collection.find(query, {"_id": 0, **HIDDEN_PROJECTION}))
+
+def build_data_payload(data_list, draw):
+    """Turn the fetched documents into the DataTables response for the current user"""
+    if not data_list:
+        return {
+            'draw': draw,
+            'recordsTotal': 0,
+            'recordsFiltered': 0,
+            'data': []
+        }
+
+    # Create safe column names (exclude _id from display columns for users)
+    if g.role == 'admin':
+        original_columns = [str(col).strip() for col in data_list[0].keys() if col != '_id']
+        safe_columns = [f"col_{i}" for i in range(len(original_columns))]
+        column_mapping = dict(zip(original_columns, safe_columns))
+        
+        # Convert data to safe columns and add record_id for admin
+        for row in data_list:
+            row['record_id'] = str(row['_id'])
+            del row['_id']
+            for orig, safe in column_mapping.items():
+                if orig in row:
+                    row[safe] = row.pop(orig)
+    else:
+        # For users, apply column permissions
+        all_columns = [str(col).strip() for col in data_list[0].keys()]
+        column_permissions = g.column_permissions
+        
+        # If user has column permissions, filter columns
+        if column_permissions:
+            original_columns = [col for col in all_columns if col in column_permissions]
         else:
-            # For users, apply column permissions
-            all_columns = [str(col).strip() for col in data_list[0].keys()]
-            column_permissions = session.get('column_permissions', [])
-            
-            # If user has column permissions, filter columns
+            original_columns = all_columns
+        
+        safe_columns = [f"col_{i}" for i in range(len(original_columns))]
+        column_mapping = dict(zip(original_columns, safe_columns))
+        
+        # Convert data to safe columns and filter out restricted columns
+        for row in data_list:
+            # Remove columns that user doesn't have permission to see
             if column_permissions:
-                original_columns = [col for col in all_columns if col in column_permissions]
-            else:
-                original_columns = all_columns
-            
-            safe_columns = [f"col_{i}" for i in range(len(original_columns))]
-            column_mapping = dict(zip(original_columns, safe_columns))
+                keys_to_remove = [key for key in row.keys() if key not in column_permissions]
+                for key in keys_to_remove:
+                    del row[key]
             
-            # Convert data to safe columns and filter out restricted columns
-            for row in data_list:
-                # Remove columns that user doesn't have permission to see
-                if column_permissions:
-                    keys_to_remove = [key for key in row.keys() if key not in column_permissions]
-                    for key in keys_to_remove:
-                        del row[key]
-                
-                # Convert remaining columns to safe names
-                for orig, safe in column_mapping.items():
-                    if orig in row:
-                        row[safe] = row.pop(orig)
-
-        import pandas as pd
-        df = pd.DataFrame(data_list)
-        if df.empty:
-            return jsonify({
-                'draw': int(req.get('draw', 1)),
-                'recordsTotal': 0,
-                'recordsFiltered': 0,
-                'data': []
-            })
+            # Convert remaining columns to safe names
+            for orig, safe in column_mapping.items():
+                if orig in row:
+                    row[safe] = row.pop(orig)
 
-        # For client-side processing, return all data
-        total_records = len(df)
-        data = df.fillna('').to_dict(orient='records')
+    # Every row gets every column (blank where a document lacks it), as DataTables expects
+    row_keys = list(dict.fromkeys(key for row in data_list for key in row))
+    data = [{key: clean_value(row.get(key)) for key in row_keys} for row in data_list]
 
-        # Ensure all values are JSON serializable
-        for row in data:
-            for key, value in row.items():
-                if value is None:
-                    row[key] = ''
-
-        print(f"Returning {len(data)} rows for user {session.get('username')} with permissions {location_permissions}")
-        response_data = {
-            'draw': int(req.get('draw', 1)),
-            'recordsTotal': int(total_records),
-            'recordsFiltered': int(total_records),
-            'data': data
-        }
+    # For client-side processing, return all data
+    total_records = len(data)
+    return {
+        'draw': draw,
+        'recordsTotal': int(total_records),
+        'recordsFiltered': int(total_records),
+        'data': data
+    }
+
+def data_error_payload(e):
+    """Always return a valid DataTables response, even on error"""
+    return {
+        'draw': 1,
+        'recordsTotal': 0,
+        'recordsFiltered': 0,
+        'data': [],
+        'error': f"Error processing request: {str(e)}"
+    }
+
+@app.route('/data', methods=['POST'])
+@login_required
+def data():
+    try:
+        # Get form data from request
+        req = request.form
+        print("Received data request:", req)
+
+        # Build query based on user permissions and the optional purchase date / price ranges
+        query = build_data_query(req)
+        data_list = fetch_data_documents(query)
+        response_data = build_data_payload(data_list, int(req.get('draw', 1)))
+        print(f"Returning {len(response_data['data'])} rows for user {session.get('username')} with permissions {g.location_permissions}")
         return jsonify(response_data)
     except Exception as e:
         import traceback
         print(f"Error processing data request: {str(e)}")
         print(traceback.format_exc())
-        # Always return a valid DataTables response, even on error
-        return jsonify({
-            'draw': 1,
-            'recordsTotal': 0,
-            'recordsFiltered': 0,
-            'data': [],
-            'error': f"Error processing request: {str(e)}"
-        })
+        return jsonify(data_error_payload(e))
 
 @app.route('/edit/<record_id>', methods=['POST'])
 @login_required
@@ -2005,14 +2476,19 @@ def edit_record(record_id):
         data = request.get_json()
         print(f"Editing record {record_id} with data: {data}")
         
-        # Update the document in MongoDB
-        result = mongo_collection.update_one(
+        # Update the document in MongoDB and get it back in one round trip
+        columns = get_grid_columns()
+        updated_doc = mongo_collection.find_one_and_update(
             {"_id": ObjectId(record_id)},
-            {"$set": data}
+            typed_update(data),
+            projection={col: 1 for col in columns},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count > 0:
-            return jsonify({"success": True, "message": "Record updated successfully"})
+        if updated_doc:
+            add_location_values([data])
+            bump_inventory_version(catalogue_current=not touches_location_columns(data))
+            return jsonify({"success": True, "message": "Record updated successfully", "record": to_grid_row(updated_doc, columns)})
         else:
             return jsonify({"success": False, "message": "Record not found"}), 404
             
@@ -2020,6 +2496,49 @@ def edit_record(record_id):
         print(f"Error updating record: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/records/edit', methods=['POST'])
+@login_required
+@admin_required
+def batch_edit_records():
+    try:
+        data = request.get_json() or {}
+        edits = data.get('edits', [])
+        print(f"Applying {len(edits)} buffered cell edit(s)")
+
+        if not edits:
+            return jsonify({"success": True, "message": "Nothing to update", "records": []})
+
+        # Merge the queued cell edits so each record gets a single $set (later edits win)
+        merged_edits = {}
+        for edit in edits:
+            merged_edits.setdefault(edit['id'], {})[edit['column']] = edit['value']
+
+        operations = [
+            UpdateOne({"_id": ObjectId(record_id)}, typed_update(fields))
+            for record_id, fields in merged_edits.items()
+        ]
+        result = mongo_collection.bulk_write(operations, ordered=False)
+        edited_fields = list(merged_edits.values())
+        add_location_values(edited_fields)
+        bump_inventory_version(catalogue_current=not any(touches_location_columns(fields) for fields in edited_fields))
+
+        columns = get_grid_columns()
+        object_ids = [ObjectId(record_id) for record_id in merged_edits]
+        records = [
+            to_grid_row(doc, columns)
+            for doc in mongo_collection.find({"_id": {"$in": object_ids}}, {col: 1 for col in columns})
+        ]
+
+        return jsonify({
+            "success": True,
+            "message": f"{result.matched_count} record(s) updated successfully",
+            "records": records
+        })
+
+    except Exception as e:
+        print(f"Error applying batch edit: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @app.route('/delete/<record_id>', methods=['DELETE'])
 @login_required
 @admin_required
@@ -2028,10 +2547,15 @@ def delete_record(record_id):
         print(f"Deleting record {record_id}")
         
         # Delete the document from MongoDB
-        result = mongo_collection.delete_one({"_id": ObjectId(record_id)})
+        columns = get_grid_columns()
+        deleted_doc = mongo_collection.find_one_and_delete(
+            {"_id": ObjectId(record_id)},
+            projection={col: 1 for col in columns}
+        )
         
-        if result.deleted_count > 0:
-            return jsonify({"success": True, "message": "Record deleted successfully"})
+        if deleted_doc:
+            bump_inventory_version(catalogue_current=False)
+            return jsonify({"success": True, "message": "Record deleted successfully", "record": to_grid_row(deleted_doc, columns)})
         else:
             return jsonify({"success": False, "message": "Record not found"}), 404
             
@@ -2047,11 +2571,19 @@ def add_record():
         data = request.get_json()
         print(f"Adding new record with data: {data}")
         
-        # Insert the new document into MongoDB
+        # Insert the new document into MongoDB (insert_one sets data['_id'])
+        data = with_typed_fields(data)
         result = mongo_collection.insert_one(data)
         
         if result.inserted_id:
-            return jsonify({"success": True, "message": "Record added successfully", "id": str(result.inserted_id)})
+            add_location_values([data])
+            bump_inventory_version()
+            return jsonify({
+                "success": True,
+                "message": "Record added successfully",
+                "id": str(result.inserted_id),
+                "record": to_grid_row(data, get_grid_columns())
+            })
         else:
             return jsonify({"success": False, "message": "Failed to add record"}), 500
             
@@ -2059,12 +2591,70 @@ def add_record():
         print(f"Error adding record: {str(e)}")
         return jsonify({"success": False, "message": str(e)}), 500
 
+@app.route('/records/duplicate', methods=['POST'])
+@login_required
+@admin_required
+def duplicate_records():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "message": "Expected a JSON object with 'ids'"}), 400
+        record_ids = data.get('ids') or []
+        overrides = data.get('overrides') or {}
+        print(f"Duplicating records {record_ids} with overrides: {overrides}")
+
+        if not isinstance(record_ids, list):
+            return jsonify({"success": False, "message": "'ids' must be a list of record ids"}), 400
+        if not record_ids:
+            return jsonify({"success": False, "message": "No records selected"}), 400
+        invalid_ids = [record_id for record_id in record_ids if not isinstance(record_id, str) or not ObjectId.is_valid(record_id)]
+        if invalid_ids:
+            return jsonify({"success": False, "message": f"Invalid record id: {invalid_ids[0]}"}), 400
+        if not isinstance(overrides, dict):
+            return jsonify({"success": False, "message": "'overrides' must be an object of column values"}), 400
+        invalid_columns = [col for col in overrides if col == '_id' or col.startswith('$') or col in HIDDEN_PROJECTION]
+        if invalid_columns:
+            return jsonify({"success": False, "message": f"Column cannot be overridden: {invalid_columns[0]}"}), 400
+
+        # Clone the stored documents server-side so hidden columns are kept too
+        object_ids = [ObjectId(record_id) for record_id in record_ids]
+        source_docs = {doc['_id']: doc for doc in mongo_collection.find({"_id": {"$in": object_ids}})}
+
+        new_docs = []
+        for object_id in object_ids:
+            doc = source_docs.get(object_id)
+            if doc is None:
+                continue
+            doc = dict(doc)
+            del doc['_id']
+            doc.update(overrides)
+            new_docs.append(with_typed_fields(doc))
+
+        if not new_docs:
+            return jsonify({"success": False, "message": "Records not found"}), 404
+
+        result = mongo_collection.insert_many(new_docs)
+        add_location_values(new_docs)
+        bump_inventory_version()
+        new_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+        columns = get_grid_columns()
+        return jsonify({
+            "success": True,
+            "message": f"{len(new_ids)} record(s) duplicated successfully",
+            "ids": new_ids,
+            "records": [to_grid_row(doc, columns) for doc in new_docs]
+        })
+
+    except Exception as e:
+        print(f"Error duplicating records: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @app.route('/get_columns')
 @login_required
 def get_columns():
     try:
         # Get a sample document to determine the columns
-        sample_doc = mongo_collection.find_one({}, {"_id": 0})
+        sample_doc = mongo_collection.find_one({}, {"_id": 0, **HIDDEN_PROJECTION})
         if sample_doc:
             columns = list(sample_doc.keys())
             return jsonify({"success": True, "columns": columns})
@@ -2073,65 +2663,1251 @@ def get_columns():
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
-@app.route('/download')
-@login_required
-def download():
-    # Download as CSV from MongoDB
-    import pandas as pd
-    data = list(mongo_collection.find({}, {"_id": 0}))
-    if not data:
-        return "No data available.", 404
-    df = pd.DataFrame(data)
-    temp_path = os.path.join(tempfile.gettempdir(), 'ICT_Inventory_mongodb.csv')
-    df.to_csv(temp_path, index=False)
-    return send_file(temp_path, as_attachment=True)
-
-# User Management Routes
-@app.route('/manage_users')
+@app.route('/metrics')
 @login_required
 @admin_required
-def manage_users():
-    # Get all users from MongoDB (excluding hidden ones)
-    users = list(users_collection.find({}))
-    
-    # Get unique location values for permissions and all columns for column permissions
-    try:
-        # Use the same logic as the data table: get columns from the first document
-        data_list = list(mongo_collection.find({}, {"_id": 0}))
-        location_columns = []
-        all_columns = []
-        if data_list:
-            all_columns = [str(col).strip() for col in data_list[0].keys()]
-            for key in data_list[0].keys():
-                key_lower = str(key).lower()
-                if any(term in key_lower for term in ['location', 'batiment', 'building', 'room', 'site']):
-                    location_columns.append(str(key).strip())
-        # Get unique values for each location column
-        location_values = {}
-        for col in location_columns:
-            values = mongo_collection.distinct(col)
-            location_values[col] = [v for v in values if v and str(v).strip()]
-    except Exception as e:
-        print(f"Error getting columns: {e}")
-        location_columns = []
-        location_values = {}
-        all_columns = []
-    
-    return render_template_string('''
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-            <title>ICT Inventory - User Management</title>
-            <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/css/bootstrap.min.css">
-            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-            <style>
-                body { background: #f8f9fa; }
-                .navbar { background: #343a40; }
-                .navbar-brand, .navbar-nav .nav-link { color: #fff !important; }
-                .card { box-shadow: 0 2px 12px rgba(0,0,0,0.08); border-radius: 1rem; }
-                .user-info { background: #007bff; color: white; padding: 8px 15px; border-radius: 20px; font-size: 14px; margin-right: 10px; }
+def metrics():
+    """Connection pool metrics for this worker process"""
+    pool = pool_metrics.snapshot()
+    checkouts = pool['checkouts']
+    pool['checkout_wait_seconds_avg'] = pool['checkout_wait_seconds_total'] / checkouts if checkouts else 0.0
+    options = mongo_client_options()
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "pool": pool,
+        "max_pool_size": options.get("maxPoolSize", 100),
+        "options": options,
+    })
+
+# Number of documents fetched per cursor batch and written per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+class CsvExportChunks:
+    """Format export documents as CSV text, handing back one chunk per EXPORT_BATCH_SIZE rows.
+
+    Shared by the WSGI export below and the async one in asgi.py, which only differ in how
+    they iterate the cursor.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.rows_in_buffer = 0
+
+    def header(self):
+        """Return the header line as its own chunk"""
+        self.writer.writerow(self.columns)
+        return self.take()
+
+    def add(self, doc):
+        """Add one document; returns a chunk once EXPORT_BATCH_SIZE rows are buffered, else None"""
+        self.writer.writerow([clean_value(doc.get(col, '')) for col in self.columns])
+        self.rows_in_buffer += 1
+        if self.rows_in_buffer >= EXPORT_BATCH_SIZE:
+            return self.take()
+        return None
+
+    def take(self):
+        """Return and clear whatever is buffered (may be empty)"""
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate(0)
+        self.rows_in_buffer = 0
+        return chunk
+
+def iter_csv_export(cursor, columns):
+    """Yield the CSV export in chunks of EXPORT_BATCH_SIZE rows"""
+    chunks = CsvExportChunks(columns)
+    # Send the header straight away so the download starts immediately
+    yield chunks.header()
+    for doc in cursor:
+        chunk = chunks.add(doc)
+        if chunk:
+            yield chunk
+    chunk = chunks.take()
+    if chunk:
+        yield chunk
+
+# Column width bounds (in characters) for the XLSX export
+XLSX_MIN_COLUMN_WIDTH = 10
+XLSX_MAX_COLUMN_WIDTH = 40
+
+def xlsx_value(value):
+    """Convert a MongoDB value into something openpyxl can write to a cell"""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    value = clean_value(value)
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    if isinstance(value, (bool, int, float, datetime.datetime, datetime.date)):
+        return value
+    return str(value)
+
+def build_xlsx_export(cursor, columns, target):
+    """Write the export to target (a path or binary file) with a write-only workbook"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('ICT Inventory')
+    sheet.freeze_panes = 'A2'
+
+    # Widths come from the header names; write-only sheets can't be measured afterwards
+    for i, col in enumerate(columns, 1):
+        longest_line = max(len(line) for line in str(col).split('\n'))
+        width = min(max(longest_line + 2, XLSX_MIN_COLUMN_WIDTH), XLSX_MAX_COLUMN_WIDTH)
+        sheet.column_dimensions[get_column_letter(i)].width = width
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(fill_type='solid', start_color='343A40', end_color='343A40')
+    header_alignment = Alignment(wrap_text=True, vertical='center')
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(sheet, value=xlsx_value(col))
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header.append(cell)
+    sheet.append(header)
+
+    for doc in cursor:
+        sheet.append([xlsx_value(doc.get(col, '')) for col in columns])
+
+    workbook.save(target)
+
+# Rows per Parquet row group; analysts read column chunks of this many rows at a time
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# Arrow types of the typed copies, added next to the text columns as "_typed.<key>"
+PARQUET_TYPED_TYPES = {
+    "purchase_date": "timestamp[ms]",
+    "purchase_price": "float64",
+}
+
+def parquet_value(value):
+    """Inventory cells are free text, so Parquet columns are nullable strings"""
+    value = clean_value(value)
+    if value == '':
+        return None
+    return str(value)
+
+def parquet_typed_keys(columns):
+    """Typed copies to export, only for source columns the caller can see"""
+    return [typed_key for column, (typed_key, _) in TYPED_COLUMNS.items() if column in columns]
+
+def build_parquet_export(cursor, columns, target):
+    """Write the export to target as Parquet, one row group per PARQUET_ROW_GROUP_SIZE documents.
+
+    The text columns stay strings; the typed purchase date and price are added as real
+    timestamp/float64 columns so analysts can filter and aggregate them directly.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    typed_keys = parquet_typed_keys(columns)
+    fields = [pa.field(str(col), pa.string()) for col in columns]
+    fields += [pa.field(f"{TYPED_FIELD}.{key}", pa.type_for_alias(PARQUET_TYPED_TYPES[key])) for key in typed_keys]
+    schema = pa.schema(fields)
+
+    with pq.ParquetWriter(target, schema) as writer:
+        batch = {field.name: [] for field in fields}
+        batch_rows = 0
+        for doc in cursor:
+            for col in columns:
+                batch[str(col)].append(parquet_value(doc.get(col)))
+            typed = doc.get(TYPED_FIELD) or {}
+            for key in typed_keys:
+                batch[f"{TYPED_FIELD}.{key}"].append(typed.get(key))
+            batch_rows += 1
+            if batch_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+                batch = {field.name: [] for field in fields}
+                batch_rows = 0
+        if batch_rows:
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+
+# Export cache: finished CSV/XLSX/Parquet files keyed by what they contain
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ict_inventory_exports"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def get_inventory_version():
+    """Return the inventory version counter (bumped on every write)"""
+    doc = metadata_collection.find_one({"_id": "inventory"})
+    return doc.get('version', 0) if doc else 0
+
+def bump_inventory_version(catalogue_current=True):
+    """Mark the inventory as changed so cached exports are no longer served.
+
+    Pass catalogue_current=False when the write may have removed location values,
+    so the location catalogue is rebuilt the next time it is read.
+    """
+    metadata_collection.update_one({"_id": "inventory"}, {"$inc": {"version": 1}}, upsert=True)
+    if catalogue_current:
+        metadata_collection.update_one({"_id": "location_catalogue"}, {"$inc": {"version": 1}})
+
+def export_cache_key(export_format, columns, query, sort, version):
+    """Hash everything that determines an export's content; the query already carries the caller's permissions"""
+    signature = json.dumps([export_format, columns, query, sort, version], sort_keys=True, default=str)
+    return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+def new_export_cache_temp():
+    """Create a hidden in-progress file inside the cache directory and return (fd, path)"""
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    return tempfile.mkstemp(dir=EXPORT_CACHE_DIR, prefix='.', suffix='.part')
+
+def store_cached_export(temp_path, cache_path):
+    """Move a finished export into the cache and evict least recently used artifacts"""
+    try:
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        # On Windows the target can't be replaced while another download is reading it
+        print(f"Could not cache export {cache_path}: {e}")
+        os.remove(temp_path)
+    evict_export_cache()
+
+def evict_export_cache():
+    """Remove least recently used artifacts until the cache fits in EXPORT_CACHE_MAX_BYTES"""
+    entries = []
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        if name.startswith('.'):
+            continue  # export still being written
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= EXPORT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            pass
+
+def send_cached_export(cache_path, export_format, cache_key):
+    """Serve a cached artifact with conditional GET and Range support"""
+    # Access time drives LRU eviction; mtime is left alone so Last-Modified stays stable
+    stat = os.stat(cache_path)
+    os.utime(cache_path, (time.time(), stat.st_mtime))
+    return send_file(
+        cache_path,
+        mimetype=EXPORT_MIMETYPES[export_format],
+        as_attachment=True,
+        download_name=f'ICT_Inventory_mongodb.{export_format}',
+        conditional=True,
+        etag=cache_key,
+        max_age=0
+    )
+
+class ExportCacheWriter:
+    """Copy streamed export chunks into a hidden temp file, moved into the cache once complete"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        fd, self.temp_path = new_export_cache_temp()
+        self.file = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+        self.completed = False
+
+    def write(self, chunk):
+        """Write a chunk and return it, so it can be passed on to the client"""
+        self.file.write(chunk)
+        return chunk
+
+    def commit(self):
+        """The whole export was sent: publish it in the cache"""
+        self.file.close()
+        self.completed = True
+        store_cached_export(self.temp_path, self.cache_path)
+
+    def discard(self):
+        """Call when the stream ends; interrupted downloads leave nothing behind in the cache"""
+        self.file.close()
+        if not self.completed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+def tee_to_export_cache(chunks, cache_path):
+    """Pass CSV chunks through to the client while writing them to the export cache"""
+    cache = ExportCacheWriter(cache_path)
+    try:
+        for chunk in chunks:
+            yield cache.write(chunk)
+        cache.commit()
+    finally:
+        cache.discard()
+
+def filter_candidates(value):
+    """Values a grid filter should match; the grid compares displayed text, so numbers are stored as numbers"""
+    candidates = [value]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return candidates
+    candidates.append(number)
+    if number.is_integer():
+        candidates.append(int(number))
+    return candidates
+
+# DataTables' smart search: words separated by spaces, or "quoted phrases"
+SEARCH_TERM_RE = re.compile(r'"[^"]*"|\S+')
+
+def build_search_terms(search):
+    """Split the search box into the terms the grid matches separately"""
+    terms = [term[1:-1] if term.startswith('"') and term.endswith('"') and len(term) > 1 else term
+             for term in SEARCH_TERM_RE.findall(search)]
+    return [term for term in terms if term]
+
+def build_term_condition(columns, term):
+    """A case-insensitive substring match for one term in any column, numbers included.
+
+    $regex only sees strings, so numeric cells (ID, price, ...) are compared through their
+    string form like the browser does. NaN left by the CSV import shows as blank, and since
+    MongoDB orders NaN below -Infinity, the $gte keeps it from matching "nan".
+    """
+    pattern = re.escape(term)
+    numeric_matches = [
+        {"$regexMatch": {
+            "input": {"$cond": [
+                {"$and": [{"$isNumber": f"${col}"}, {"$gte": [f"${col}", float('-inf')]}]},
+                {"$toString": f"${col}"},
+                "",
+            ]},
+            "regex": pattern,
+            "options": "i",
+        }}
+        for col in columns
+    ]
+    return {"$or": [{col: {"$regex": pattern, "$options": "i"}} for col in columns] + [{"$expr": {"$or": numeric_matches}}]}
+
+def build_search_condition(columns, search):
+    """Match the grid's search box: every term must be found in some column of the row"""
+    conditions = [build_term_condition(columns, term) for term in build_search_terms(search)]
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def build_export_query(columns, params):
+    """Combine the caller's permissions with the grid's column filters and search box into one query"""
+    conditions = []
+    permission_query = build_permission_query()
+    if permission_query:
+        conditions.append(permission_query)
+
+    # Only filter on columns the caller can see
+    filters = json.loads(params.get('filters') or '{}')
+    for column, value in filters.items():
+        if column in columns:
+            conditions.append({column: {"$in": filter_candidates(value)}})
+
+    # Range filters run against the indexed typed copies of purchase date and price
+    conditions.extend(typed_range_conditions(params))
+
+    search_condition = build_search_condition(columns, params.get('search') or '')
+    if search_condition:
+        conditions.append(search_condition)
+
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def build_export_sort(columns, params):
+    """Translate the grid's [[column, direction], ...] ordering into a MongoDB sort"""
+    sort = json.loads(params.get('sort') or '[]')
+    return [(column, -1 if direction == 'desc' else 1) for column, direction in sort if column in columns]
+
+class ExportRequestError(Exception):
+    """Raised when export parameters are invalid; carries the HTTP status to return"""
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+def resolve_export(params):
+    """Work out what an export contains for the current user from the grid state in params"""
+    export_format = (params.get('format') or 'csv').lower()
+    if export_format not in EXPORT_MIMETYPES:
+        raise ExportRequestError(f"Unsupported export format: {export_format}", 400)
+    if export_format == 'parquet':
+        try:
+            import pyarrow
+        except ImportError:
+            raise ExportRequestError("Parquet export requires the pyarrow package", 501)
+
+    columns = get_grid_columns()
+    if not columns:
+        raise ExportRequestError("No data available.", 404)
+    try:
+        query = build_export_query(columns, params)
+        sort = build_export_sort(columns, params)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ExportRequestError(f"Invalid export parameters: {e}", 400)
+
+    cache_key = export_cache_key(export_format, columns, query, sort, get_inventory_version())
+    return {
+        'format': export_format,
+        'columns': columns,
+        'query': query,
+        'sort': sort,
+        'cache_key': cache_key,
+        'cache_path': os.path.join(EXPORT_CACHE_DIR, f"{cache_key}.{export_format}"),
+    }
+
+def export_projection(export):
+    """Only the exported columns (plus the typed copies Parquet adds) are read from MongoDB"""
+    projection = {col: 1 for col in export['columns']}
+    projection["_id"] = 0
+    if export['format'] == 'parquet':
+        for typed_key in parquet_typed_keys(export['columns']):
+            projection[f"{TYPED_FIELD}.{typed_key}"] = 1
+    return projection
+
+def open_export_cursor(export):
+    """Run the export query; permissions, filters and column restrictions are all applied by MongoDB"""
+    cursor = mongo_collection.find(export['query'], export_projection(export), batch_size=EXPORT_BATCH_SIZE)
+    if export['sort']:
+        cursor = cursor.sort(export['sort'])
+    return cursor
+
+def write_export_to_cache(export, cursor):
+    """Write a complete export file into the cache"""
+    fd, temp_path = new_export_cache_temp()
+    try:
+        if export['format'] == 'xlsx':
+            # openpyxl spools write-only rows to disk, so the sheet is never held in memory
+            with os.fdopen(fd, 'wb') as export_file:
+                build_xlsx_export(cursor, export['columns'], export_file)
+        elif export['format'] == 'parquet':
+            with os.fdopen(fd, 'wb') as export_file:
+                build_parquet_export(cursor, export['columns'], export_file)
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as export_file:
+                for chunk in iter_csv_export(cursor, export['columns']):
+                    export_file.write(chunk)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    store_cached_export(temp_path, export['cache_path'])
+
+@app.route('/download')
+@login_required
+def download():
+    try:
+        export = resolve_export(request.args)
+    except ExportRequestError as e:
+        return str(e), e.status
+
+    # Reuse a previously generated export if nothing it depends on has changed
+    if os.path.isfile(export['cache_path']):
+        try:
+            return send_cached_export(export['cache_path'], export['format'], export['cache_key'])
+        except FileNotFoundError:
+            pass  # evicted in the meantime, rebuild below
+
+    cursor = open_export_cursor(export)
+    if export['format'] != 'csv':
+        write_export_to_cache(export, cursor)
+        return send_cached_export(export['cache_path'], export['format'], export['cache_key'])
+
+    # Stream the CSV straight from a MongoDB cursor, caching it on the way
+    return Response(
+        stream_with_context(tee_to_export_cache(iter_csv_export(cursor, export['columns']), export['cache_path'])),
+        mimetype=EXPORT_MIMETYPES['csv'],
+        headers={'Content-Disposition': 'attachment; filename=ICT_Inventory_mongodb.csv'}
+    )
+
+# Background export jobs: a small dedicated pool so big exports can't starve /data.
+# Both limits are per process: under gunicorn every worker has its own pool and queue,
+# so serve.py lowers them to keep the site-wide totals close to these defaults.
+EXPORT_MAX_WORKERS = int(os.getenv("EXPORT_MAX_WORKERS", "2"))
+EXPORT_MAX_PENDING_JOBS = int(os.getenv("EXPORT_MAX_PENDING_JOBS", "10"))
+EXPORT_JOB_TTL_SECONDS = JOB_RETENTION_SECONDS
+
+def publish_job(job, force=False):
+    """Mirror a job's state to jobs_collection, at most once per JOB_PUBLISH_INTERVAL_SECONDS unless forced"""
+    now = time.time()
+    if not force and now - job.get('published', 0) < JOB_PUBLISH_INTERVAL_SECONDS:
+        return
+    job['published'] = now
+    try:
+        doc = dict(job, updated_at=datetime.datetime.utcnow())
+        doc['_id'] = doc.pop('id')
+        jobs_collection.replace_one({"_id": doc['_id']}, doc, upsert=True)
+    except Exception as e:
+        print(f"Error publishing job {job['id']}: {str(e)}")
+
+class JobRegistry:
+    """Jobs of one kind started by this process, forgotten ttl_seconds after they finish"""
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def prune(self):
+        """Drop finished jobs older than ttl_seconds (caller holds self.lock)"""
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.get('finished', time.time()) < cutoff]:
+            del self.jobs[job_id]
+
+    def add(self, job, max_pending=None):
+        """Register a new job; returns False without adding it when max_pending jobs are already queued or running"""
+        with self.lock:
+            self.prune()
+            if max_pending is not None:
+                pending = sum(1 for j in self.jobs.values() if j['status'] in ('queued', 'running'))
+                if pending >= max_pending:
+                    return False
+            self.jobs[job['id']] = job
+        return True
+
+    def find(self, job_id):
+        """Return a job from this process, or the mirrored copy published by another worker"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job:
+            return job
+        doc = jobs_collection.find_one({"_id": job_id})
+        if doc:
+            doc['id'] = doc.pop('_id')
+        return doc
+
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_MAX_WORKERS, thread_name_prefix="export")
+export_jobs = JobRegistry(EXPORT_JOB_TTL_SECONDS)
+
+def count_exported_rows(cursor, job):
+    """Pass documents through while recording progress on the job"""
+    for doc in cursor:
+        job['rows_written'] += 1
+        publish_job(job)
+        yield doc
+
+def run_export_job(job, export):
+    """Build an export into the cache on a worker thread, updating the job as it goes"""
+    job['status'] = 'running'
+    try:
+        job['total_rows'] = mongo_collection.count_documents(export['query'])
+        publish_job(job, force=True)
+        cursor = open_export_cursor(export)
+        write_export_to_cache(export, count_exported_rows(cursor, job))
+        job['status'] = 'done'
+    except Exception as e:
+        print(f"Error running export job {job['id']}: {str(e)}")
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        job['finished'] = time.time()
+        publish_job(job, force=True)
+
+def export_job_status(job):
+    """Build the JSON progress report for a job"""
+    total_rows = job['total_rows']
+    if job['status'] == 'done':
+        percent = 100
+    elif total_rows:
+        percent = min(99, int(job['rows_written'] * 100 / total_rows))
+    else:
+        percent = 0
+    status = {
+        "success": True,
+        "id": job['id'],
+        "status": job['status'],
+        "format": job['format'],
+        "rows_written": job['rows_written'],
+        "total_rows": total_rows,
+        "percent": percent,
+    }
+    if job['status'] == 'done':
+        status['download_url'] = url_for('download_export_job', job_id=job['id'])
+    if job['status'] == 'failed':
+        status['message'] = job['error']
+    return status
+
+def get_export_job(job_id):
+    """Return the job if it exists and belongs to the current user (admins see all jobs)"""
+    job = export_jobs.find(job_id)
+    if job and (job['username'] == session.get('username') or g.role == 'admin'):
+        return job
+    return None
+
+@app.route('/exports', methods=['POST'])
+@login_required
+def create_export_job():
+    try:
+        export = resolve_export(request.get_json() or {})
+    except ExportRequestError as e:
+        return jsonify({"success": False, "message": str(e)}), e.status
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'username': session.get('username'),
+        'format': export['format'],
+        'cache_key': export['cache_key'],
+        'cache_path': export['cache_path'],
+        'status': 'queued',
+        'rows_written': 0,
+        'total_rows': 0,
+        'error': None,
+    }
+
+    if not export_jobs.add(job, max_pending=EXPORT_MAX_PENDING_JOBS):
+        return jsonify({"success": False, "message": "Too many exports in progress, try again shortly"}), 429
+
+    if os.path.isfile(export['cache_path']):
+        # Already generated and still current
+        job['status'] = 'done'
+        job['finished'] = time.time()
+        publish_job(job, force=True)
+    else:
+        publish_job(job, force=True)
+        export_executor.submit(run_export_job, job, export)
+
+    return jsonify(export_job_status(job)), 202
+
+# Export helpers shared by the admin and user dashboards
+EXPORT_SCRIPT = '''
+function startExport(link, params) {
+    // CSV streams straight away; Excel and Parquet files are built by a background job
+    if (params.format === 'csv') {
+        window.location = '{{ url_for('download') }}?' + $.param(params);
+        return;
+    }
+    if (link.hasClass('disabled')) return;
+
+    const originalHtml = link.html();
+    link.addClass('disabled').html('<i class="fas fa-spinner fa-spin mr-2"></i>Preparing 0%');
+    const finish = function() {
+        link.removeClass('disabled').html(originalHtml);
+    };
+    const poll = function(job) {
+        if (job.status === 'done') {
+            finish();
+            window.location = job.download_url;
+        } else if (job.status === 'failed') {
+            finish();
+            alert('Export failed: ' + job.message);
+        } else {
+            link.html('<i class="fas fa-spinner fa-spin mr-2"></i>Preparing ' + job.percent + '%');
+            setTimeout(function() {
+                $.getJSON('{{ url_for('create_export_job') }}/' + job.id, poll).fail(function() {
+                    finish();
+                    alert('Error checking export progress');
+                });
+            }, 1000);
+        }
+    };
+
+    $.ajax({
+        url: '{{ url_for('create_export_job') }}',
+        method: 'POST',
+        contentType: 'application/json',
+        data: JSON.stringify(params),
+        success: poll,
+        error: function(xhr) {
+            finish();
+            alert('Error starting export: ' + ((xhr.responseJSON && xhr.responseJSON.message) || xhr.statusText));
+        }
+    });
+}
+
+function exportParams(table, columns, columnFilters, format, columnOffset) {
+    // Send filters and sort order by column name so the server can build the query;
+    // columnOffset skips leading non-data columns (the admin grid's checkbox column)
+    const filters = {};
+    for (let colIndex in columnFilters) {
+        filters[columns[colIndex]] = columnFilters[colIndex];
+    }
+    const sort = [];
+    table.order().forEach(([colIndex, direction]) => {
+        const columnName = columns[colIndex - columnOffset];
+        if (columnName !== undefined) {
+            sort.push([columnName, direction]);
+        }
+    });
+    return {
+        format: format,
+        filters: JSON.stringify(filters),
+        sort: JSON.stringify(sort),
+        search: table.search()
+    };
+}
+'''
+
+@app.route('/export.js')
+@login_required
+def export_script():
+    return Response(render_template_string(EXPORT_SCRIPT), mimetype='application/javascript')
+
+@app.route('/exports/<job_id>')
+@login_required
+def get_export_job_status(job_id):
+    job = get_export_job(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "Export not found"}), 404
+    return jsonify(export_job_status(job))
+
+@app.route('/exports/<job_id>/download')
+@login_required
+def download_export_job(job_id):
+    job = get_export_job(job_id)
+    if not job:
+        return "Export not found", 404
+    if job['status'] != 'done':
+        return "Export not ready", 409
+    try:
+        return send_cached_export(job['cache_path'], job['format'], job['cache_key'])
+    except FileNotFoundError:
+        return "Export expired, please export again", 410
+
+# Web imports: uploads are saved to a temp file and ingested in batches by a single worker
+# thread per process (so one import at a time per gunicorn worker)
+IMPORT_BATCH_SIZE = 1000
+IMPORT_DIFF_EXAMPLES = 20
+
+IMPORT_JOB_TTL_SECONDS = JOB_RETENTION_SECONDS
+
+import_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+import_jobs = JobRegistry(IMPORT_JOB_TTL_SECONDS)
+
+def coerce_import_rows(header, rows):
+    """Type rows in CSV_CHUNK_ROWS chunks exactly like the CSV uploader"""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, CSV_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield from coerce_csv_rows(header, chunk)
+
+def xlsx_import_record(header, row):
+    """openpyxl has already typed the cells (text stays text, so '00123' keeps its zeros); only blanks become NaN"""
+    values = list(row) + [None] * (len(header) - len(row))
+    return {col: float('nan') if value is None or value == '' else value for col, value in zip(header, values)}
+
+def iter_import_records(path, import_format, job):
+    """Yield one document per data row, recording read progress on the job.
+
+    Headers are named like pandas (blank -> 'Unnamed: i', repeats -> '.1'), as in the CSV uploader.
+    """
+    if import_format == 'xlsx':
+        from openpyxl import load_workbook
+        # read_only mode streams rows from the zip instead of loading the whole sheet
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            total_rows = sheet.max_row or 0
+            rows = sheet.iter_rows(values_only=True)
+            header = csv_header([str(col) if col is not None else '' for col in next(rows, [])])
+            for row_number, row in enumerate(rows, 2):
+                if total_rows:
+                    job['progress'] = row_number / total_rows
+                if all(value is None or value == '' for value in row):
+                    continue
+                yield xlsx_import_record(header, row)
+        finally:
+            workbook.close()
+    else:
+        total_bytes = os.path.getsize(path) or 1
+        with open(path, 'rb') as raw_file:
+            text_file = io.TextIOWrapper(raw_file, encoding='utf-8-sig', newline='')
+            reader = csv.reader(text_file)
+            header = csv_header(next(reader, []))
+
+            def data_rows():
+                for row in reader:
+                    job['progress'] = raw_file.tell() / total_bytes
+                    if is_blank_csv_row(row):
+                        continue
+                    yield row
+
+            yield from coerce_import_rows(header, data_rows())
+
+def import_value_repr(value):
+    """Render a value for the diff summary"""
+    value = clean_value(value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def import_batch(records, key_field, dry_run, summary):
+    """Insert or upsert one batch, counting what changed; with dry_run nothing is written"""
+    if not key_field:
+        summary['inserted'] += len(records)
+        if not dry_run:
+            try:
+                mongo_collection.insert_many([with_typed_fields(record) for record in records], ordered=False)
+            except BulkWriteError as e:
+                failed = len(e.details.get('writeErrors', []))
+                summary['inserted'] -= failed
+                summary['failed'] += failed
+        return
+
+    # find_import_key_problems has already made sure every row has its own key
+    keyed_records = {record[key_field]: record for record in records}
+
+    existing = {
+        doc.get(key_field): doc
+        for doc in mongo_collection.find({key_field: {"$in": list(keyed_records)}}, {"_id": 0})
+    }
+
+    operations = []
+    for key, record in keyed_records.items():
+        current = existing.get(key)
+        if current is None:
+            summary['inserted'] += 1
+        else:
+            changes = {
+                col: [import_value_repr(current.get(col)), import_value_repr(value)]
+                for col, value in record.items()
+                if clean_value(current.get(col)) != clean_value(value)
+            }
+            if not changes:
+                summary['unchanged'] += 1
+                continue
+            summary['updated'] += 1
+            if len(summary['examples']) < IMPORT_DIFF_EXAMPLES:
+                summary['examples'].append({'key': import_value_repr(key), 'changes': changes})
+        operations.append(UpdateOne({key_field: key}, typed_update(record), upsert=True))
+
+    if operations and not dry_run:
+        try:
+            mongo_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            summary['failed'] += len(e.details.get('writeErrors', []))
+
+IMPORT_KEY_PROBLEMS_SHOWN = 20
+
+def find_import_key_problems(path, import_format, key_field):
+    """Read the saved upload once and return (rows_without_key, duplicate_keys).
+
+    rows_without_key lists data row numbers (1 = first data row); duplicate_keys maps every key
+    that appears more than once to all of its row numbers. Same check as the CSV uploader's --upsert.
+    """
+    first_rows = {}
+    duplicate_keys = {}
+    rows_without_key = []
+    for row_number, record in enumerate(iter_import_records(path, import_format, {'progress': 0}), 1):
+        key = record.get(key_field)
+        if key is None or key != key:
+            rows_without_key.append(row_number)
+        elif key in first_rows:
+            duplicate_keys.setdefault(key, [first_rows[key]]).append(row_number)
+        else:
+            first_rows[key] = row_number
+    return rows_without_key, duplicate_keys
+
+def run_import_job(job, path):
+    """Stream the saved upload into MongoDB in IMPORT_BATCH_SIZE batches"""
+    job['status'] = 'running'
+    summary = job['summary']
+    try:
+        sample_doc = mongo_collection.find_one({}, {"_id": 0, **HIDDEN_PROJECTION})
+        inventory_columns = [str(col).strip() for col in sample_doc.keys()] if sample_doc else []
+        file_columns = None
+
+        if job['key_field']:
+            # Upserting on a missing or repeated key would merge distinct assets, so check the whole file first
+            rows_without_key, duplicate_keys = find_import_key_problems(path, job['format'], job['key_field'])
+            if rows_without_key or duplicate_keys:
+                summary['without_key'] = len(rows_without_key)
+                summary['without_key_rows'] = rows_without_key[:IMPORT_KEY_PROBLEMS_SHOWN]
+                summary['duplicate_keys'] = len(duplicate_keys)
+                summary['duplicate_key_rows'] = [
+                    {'key': import_value_repr(key), 'rows': rows}
+                    for key, rows in list(duplicate_keys.items())[:IMPORT_KEY_PROBLEMS_SHOWN]
+                ]
+                job['progress'] = 1
+                if job['dry_run']:
+                    job['status'] = 'done'
+                else:
+                    job['status'] = 'failed'
+                    job['error'] = (f"Nothing was imported: '{job['key_field']}' needs a unique value on every row "
+                                    f"({len(rows_without_key)} row(s) without one, {len(duplicate_keys)} repeated value(s))")
+                return
+
+        batch = []
+        for record in iter_import_records(path, job['format'], job):
+            if file_columns is None:
+                file_columns = list(record.keys())
+                summary['new_columns'] = [col for col in file_columns if inventory_columns and col not in inventory_columns]
+                summary['missing_columns'] = [col for col in inventory_columns if col not in file_columns]
+            batch.append(record)
+            summary['rows'] += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                import_batch(batch, job['key_field'], job['dry_run'], summary)
+                batch = []
+                publish_job(job)
+        if batch:
+            import_batch(batch, job['key_field'], job['dry_run'], summary)
+
+        if not job['dry_run'] and (summary['inserted'] or summary['updated']):
+            # Upserts can replace location values, so let the catalogue rebuild in one pass
+            bump_inventory_version(catalogue_current=False)
+        job['progress'] = 1
+        job['status'] = 'done'
+    except Exception as e:
+        print(f"Error running import job {job['id']}: {str(e)}")
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        job['finished'] = time.time()
+        publish_job(job, force=True)
+        os.remove(path)
+
+def import_job_status(job):
+    """Build the JSON progress report for an import job"""
+    status = {
+        "success": True,
+        "id": job['id'],
+        "status": job['status'],
+        "dry_run": job['dry_run'],
+        "key_field": job['key_field'],
+        "percent": int(job['progress'] * 100),
+        "summary": job['summary'],
+    }
+    if job['status'] == 'failed':
+        status['message'] = job['error']
+    return status
+
+@app.route('/import', methods=['GET'])
+@login_required
+@admin_required
+def import_page():
+    sample_doc = mongo_collection.find_one({}, {"_id": 0, **HIDDEN_PROJECTION})
+    all_columns = [str(col).strip() for col in sample_doc.keys()] if sample_doc else []
+    return render_template_string('''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+            <title>ICT Inventory - Import Data</title>
+            <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/css/bootstrap.min.css">
+            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+            <style>
+                body { background: #f8f9fa; }
+                .navbar { background: #343a40; }
+                .navbar-brand, .navbar-nav .nav-link { color: #fff !important; }
+                .card { box-shadow: 0 2px 12px rgba(0,0,0,0.08); border-radius: 1rem; }
+                .user-info { background: #007bff; color: white; padding: 8px 15px; border-radius: 20px; font-size: 14px; margin-right: 10px; }
+            </style>
+        </head>
+        <body>
+            <nav class="navbar navbar-expand-lg navbar-dark">
+                <a class="navbar-brand" href="{{ url_for('admin_dashboard') }}"><i class="fas fa-database mr-2"></i>ICT Inventory - Import Data</a>
+                <div class="navbar-nav ml-auto">
+                    <span class="user-info">
+                        <i class="fas fa-user-shield mr-2"></i>{{ session.username }} (Admin)
+                    </span>
+                    <a class="nav-link" href="{{ url_for('logout') }}">
+                        <i class="fas fa-sign-out-alt mr-2"></i>Logout
+                    </a>
+                </div>
+            </nav>
+
+            <div class="container mt-5">
+                <div class="row">
+                    <div class="col-12">
+                        <h2><i class="fas fa-file-import mr-2"></i>Import Data</h2>
+                        <p class="text-muted">Upload a CSV or Excel file. Use a dry run first to see what would change.</p>
+                    </div>
+                </div>
+
+                <div class="row mb-4">
+                    <div class="col-12">
+                        <div class="card">
+                            <div class="card-body">
+                                <form id="importForm">
+                                    <div class="form-group">
+                                        <label for="importFile">File (.csv or .xlsx)</label>
+                                        <input type="file" class="form-control-file" id="importFile" name="file" accept=".csv,.xlsx" required>
+                                    </div>
+                                    <div class="form-group">
+                                        <label for="keyField">Match existing records on</label>
+                                        <select class="form-control" id="keyField" name="key_field">
+                                            <option value="">Nothing (insert every row as a new record)</option>
+                                            {% for col in all_columns %}
+                                            <option value="{{ col }}">{{ col }}</option>
+                                            {% endfor %}
+                                        </select>
+                                    </div>
+                                    <div class="form-check mb-3">
+                                        <input class="form-check-input" type="checkbox" id="dryRun" name="dry_run" value="1" checked>
+                                        <label class="form-check-label" for="dryRun">Dry run (show the changes without saving them)</label>
+                                    </div>
+                                    <button type="submit" class="btn btn-primary" id="importBtn">
+                                        <i class="fas fa-upload mr-2"></i>Start Import
+                                    </button>
+                                    <a href="{{ url_for('admin_dashboard') }}" class="btn btn-secondary">Back to Dashboard</a>
+                                </form>
+
+                                <div id="importProgress" class="mt-4" style="display: none;">
+                                    <div class="progress">
+                                        <div class="progress-bar" role="progressbar" style="width: 0%">0%</div>
+                                    </div>
+                                </div>
+                                <div id="importSummary" class="mt-4"></div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+
+            <script src="https://code.jquery.com/jquery-3.5.1.js"></script>
+            <script src="https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/js/bootstrap.bundle.min.js"></script>
+            <script>
+            $('#importForm').on('submit', function(e) {
+                e.preventDefault();
+                $('#importBtn').prop('disabled', true);
+                $('#importSummary').empty();
+                setProgress(0);
+                $('#importProgress').show();
+
+                $.ajax({
+                    url: '{{ url_for('start_import') }}',
+                    method: 'POST',
+                    data: new FormData(this),
+                    processData: false,
+                    contentType: false,
+                    success: pollImport,
+                    error: function(xhr) {
+                        $('#importBtn').prop('disabled', false);
+                        alert('Error starting import: ' + ((xhr.responseJSON && xhr.responseJSON.message) || xhr.statusText));
+                    }
+                });
+            });
+
+            function setProgress(percent) {
+                $('#importProgress .progress-bar').css('width', percent + '%').text(percent + '%');
+            }
+
+            function pollImport(job) {
+                setProgress(job.percent);
+                if (job.status === 'done') {
+                    $('#importBtn').prop('disabled', false);
+                    showSummary(job);
+                } else if (job.status === 'failed') {
+                    $('#importBtn').prop('disabled', false);
+                    alert('Import failed: ' + job.message);
+                    if (job.summary.without_key || job.summary.duplicate_keys) showSummary(job);
+                } else {
+                    setTimeout(function() {
+                        $.getJSON('{{ url_for('start_import') }}/' + job.id, pollImport);
+                    }, 1000);
+                }
+            }
+
+            function showSummary(job) {
+                const s = job.summary;
+                const verb = job.dry_run ? 'Would' : 'Did';
+                if (s.without_key || s.duplicate_keys) {
+                    $('#importSummary').html(keyProblemsHtml(job));
+                    return;
+                }
+                let html = '<h5>' + (job.dry_run ? 'Dry run' : 'Import') + ' summary</h5><ul>';
+                html += '<li>' + s.rows + ' row(s) read</li>';
+                html += '<li>' + verb + ' add ' + s.inserted + ' new record(s)</li>';
+                if (job.key_field) {
+                    html += '<li>' + verb + ' update ' + s.updated + ' record(s)</li>';
+                    html += '<li>' + s.unchanged + ' record(s) unchanged</li>';
+                }
+                if (s.failed) html += '<li class="text-danger">' + s.failed + ' row(s) failed</li>';
+                if (s.new_columns.length) html += '<li>New columns: ' + $('<span>').text(s.new_columns.join(', ')).html() + '</li>';
+                if (s.missing_columns.length) html += '<li>Columns not in file: ' + $('<span>').text(s.missing_columns.join(', ')).html() + '</li>';
+                html += '</ul>';
+                s.examples.forEach(example => {
+                    html += '<div class="mb-2"><strong>' + $('<span>').text(example.key).html() + '</strong><ul>';
+                    for (const col in example.changes) {
+                        const change = example.changes[col];
+                        html += '<li>' + $('<span>').text(col + ': "' + change[0] + '" → "' + change[1] + '"').html() + '</li>';
+                    }
+                    html += '</ul></div>';
+                });
+                $('#importSummary').html(html);
+            }
+
+            function keyProblemsHtml(job) {
+                const s = job.summary;
+                const key = $('<span>').text(job.key_field).html();
+                let html = '<h5 class="text-danger">Nothing ' + (job.dry_run ? 'would be' : 'was') + ' imported</h5>';
+                html += '<p>' + key + ' needs a unique value on every row. Fix the file or pick another key column.</p><ul>';
+                if (s.without_key) {
+                    html += '<li>' + s.without_key + ' row(s) without a value (rows ' + s.without_key_rows.join(', ') +
+                        (s.without_key > s.without_key_rows.length ? ', ...' : '') + ')</li>';
+                }
+                if (s.duplicate_keys) {
+                    html += '<li>' + s.duplicate_keys + ' value(s) on more than one row:<ul>';
+                    s.duplicate_key_rows.forEach(duplicate => {
+                        html += '<li>' + $('<span>').text(duplicate.key).html() + ': rows ' + duplicate.rows.join(', ') + '</li>';
+                    });
+                    if (s.duplicate_keys > s.duplicate_key_rows.length) html += '<li>...</li>';
+                    html += '</ul></li>';
+                }
+                return html + '</ul>';
+            }
+            </script>
+        </body>
+        </html>
+    ''', all_columns=all_columns, session=session)
+
+@app.route('/import', methods=['POST'])
+@login_required
+@admin_required
+def start_import():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+    import_format = upload.filename.rsplit('.', 1)[-1].lower()
+    if import_format not in ('csv', 'xlsx'):
+        return jsonify({"success": False, "message": "Only .csv and .xlsx files can be imported"}), 400
+
+    # Werkzeug spools large uploads to disk; copy it to our own temp file in chunks for the worker
+    fd, path = tempfile.mkstemp(suffix=f".{import_format}")
+    with os.fdopen(fd, 'wb') as saved_file:
+        upload.save(saved_file)
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'username': session.get('username'),
+        'format': import_format,
+        'key_field': request.form.get('key_field') or None,
+        'dry_run': request.form.get('dry_run') == '1',
+        'status': 'queued',
+        'progress': 0,
+        'error': None,
+        'summary': {
+            'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0,
+            'without_key': 0, 'without_key_rows': [], 'duplicate_keys': 0, 'duplicate_key_rows': [],
+            'new_columns': [], 'missing_columns': [], 'examples': [],
+        },
+    }
+    import_jobs.add(job)
+    publish_job(job, force=True)
+    import_executor.submit(run_import_job, job, path)
+    return jsonify(import_job_status(job)), 202
+
+@app.route('/import/<job_id>')
+@login_required
+@admin_required
+def get_import_job_status(job_id):
+    job = import_jobs.find(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "Import not found"}), 404
+    return jsonify(import_job_status(job))
+
+# Location catalogue: the distinct values of every location-like column, kept in
+# location_catalogue (one document per column) so the user management page never scans
+# the inventory. Its metadata document carries the inventory version it matches; writes
+# made through the app keep both versions in step, anything else triggers a rebuild.
+LOCATION_COLUMN_TERMS = ['location', 'batiment', 'building', 'room', 'site']
+
+def is_location_column(column):
+    """Return True for columns used for location-based permissions"""
+    column_lower = str(column).lower()
+    return any(term in column_lower for term in LOCATION_COLUMN_TERMS)
+
+def touches_location_columns(fields):
+    """Return True if an edit changes a location column (the old value may disappear)"""
+    return any(is_location_column(col) for col in fields)
+
+def add_location_values(docs):
+    """Add the location values of newly written documents to the catalogue"""
+    new_values = {}
+    for doc in docs:
+        for col, value in doc.items():
+            if is_location_column(col) and value and str(value).strip():
+                new_values.setdefault(str(col).strip(), set()).add(value)
+    if not new_values:
+        return
+    operations = [
+        UpdateOne({"_id": col}, {"$addToSet": {"values": {"$each": list(values)}}}, upsert=True)
+        for col, values in new_values.items()
+    ]
+    location_catalogue_collection.bulk_write(operations, ordered=False)
+
+def rebuild_location_catalogue():
+    """Rebuild the catalogue from the inventory with a single $group aggregation"""
+    version = get_inventory_version()
+    sample_doc = mongo_collection.find_one({}, {"_id": 0, **HIDDEN_PROJECTION})
+    all_columns = [str(col).strip() for col in sample_doc.keys()] if sample_doc else []
+    location_columns = [col for col in all_columns if is_location_column(col)]
+
+    location_values = {col: [] for col in location_columns}
+    if location_columns:
+        group = {"_id": None}
+        for i, col in enumerate(location_columns):
+            group[f"c{i}"] = {"$addToSet": f"${col}"}
+        for result in mongo_collection.aggregate([{"$group": group}]):
+            for i, col in enumerate(location_columns):
+                values = [v for v in result.get(f"c{i}", []) if v and str(v).strip()]
+                location_values[col] = sorted(values, key=str)
+
+    # Replace each column in place so concurrent rebuilds never collide on _id, then drop columns that are gone
+    if location_values:
+        location_catalogue_collection.bulk_write(
+            [ReplaceOne({"_id": col}, {"values": values}, upsert=True) for col, values in location_values.items()],
+            ordered=False
+        )
+    location_catalogue_collection.delete_many({"_id": {"$nin": location_columns}})
+    metadata_collection.replace_one(
+        {"_id": "location_catalogue"},
+        {"version": version, "columns": all_columns, "location_columns": location_columns},
+        upsert=True
+    )
+    print(f"Rebuilt location catalogue: {len(location_columns)} location column(s)")
+    return all_columns, location_columns, location_values
+
+def get_location_catalogue():
+    """Return (all_columns, location_columns, location_values), rebuilding the catalogue if it is stale"""
+    meta = metadata_collection.find_one({"_id": "location_catalogue"})
+    if not meta or meta.get('version') != get_inventory_version():
+        return rebuild_location_catalogue()
+    stored_values = {doc['_id']: doc.get('values', []) for doc in location_catalogue_collection.find({})}
+    location_columns = meta.get('location_columns', [])
+    location_values = {col: sorted(stored_values.get(col, []), key=str) for col in location_columns}
+    return meta.get('columns', []), location_columns, location_values
+
+# User Management Routes
+@app.route('/manage_users')
+@login_required
+@admin_required
+def manage_users():
+    # Users are listed page by page through /api/users; location values for permissions and all columns for column permissions come from the catalogue
+    try:
+        all_columns, location_columns, location_values = get_location_catalogue()
+    except Exception as e:
+        print(f"Error getting columns: {e}")
+        location_columns = []
+        location_values = {}
+        all_columns = []
+    
+    return render_template_string('''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+            <title>ICT Inventory - User Management</title>
+            <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/css/bootstrap.min.css">
+            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+            <style>
+                body { background: #f8f9fa; }
+                .navbar { background: #343a40; }
+                .navbar-brand, .navbar-nav .nav-link { color: #fff !important; }
+                .card { box-shadow: 0 2px 12px rgba(0,0,0,0.08); border-radius: 1rem; }
+                .user-info { background: #007bff; color: white; padding: 8px 15px; border-radius: 20px; font-size: 14px; margin-right: 10px; }
                 .permission-item { background: #f8f9fa; border: 1px solid #dee2e6; border-radius: 5px; padding: 10px; margin: 5px 0; }
                 .permission-remove { color: #dc3545; cursor: pointer; float: right; }
                 .permission-remove:hover { color: #c82333; }
@@ -2258,62 +4034,27 @@ def manage_users():
                                 <h5><i class="fas fa-users mr-2"></i>Existing Users</h5>
                             </div>
                             <div class="card-body">
+                                <div class="form-group">
+                                    <input type="text" class="form-control" id="userSearch" placeholder="Search by username...">
+                                </div>
                                 <div class="table-responsive">
                                     <table class="table table-striped">
                                         <thead>
                                             <tr>
                                                 <th>Username</th>
                                                 <th>Role</th>
-                                                <th>Location Permissions</th>
-                                                <th>Column Permissions</th>
                                                 <th>Actions</th>
                                             </tr>
                                         </thead>
-                                        <tbody id="usersTable">
-                                            {% for user in users %}
-                                            <tr data-user-id="{{ user._id }}">
-                                                <td>{{ user.username }}</td>
-                                                <td>
-                                                    <span class="badge badge-{% if user.role == 'admin' %}danger{% else %}primary{% endif %}">
-                                                        {{ user.role.title() }}
-                                                    </span>
-                                                </td>
-                                                <td>
-                                                    {% if user.get('location_permissions') %}
-                                                        {% for col, values in user.location_permissions.items() %}
-                                                            <div class="permission-item">
-                                                                <strong>{{ col }}:</strong> {{ values|join(', ') }}
-                                                            </div>
-                                                        {% endfor %}
-                                                    {% else %}
-                                                        <span class="text-muted">No restrictions (Full access)</span>
-                                                    {% endif %}
-                                                </td>
-                                                <td>
-                                                    {% if user.get('column_permissions') %}
-                                                        <div class="permission-item">
-                                                            <strong>Visible Columns:</strong> {{ user.column_permissions|join(', ') }}
-                                                        </div>
-                                                    {% else %}
-                                                        <span class="text-muted">All columns visible</span>
-                                                    {% endif %}
-                                                </td>
-                                                <td>
-                                                    <button class="btn btn-sm btn-warning edit-user-btn" data-user-id="{{ user._id }}">
-                                                        <i class="fas fa-edit"></i> Edit
-                                                    </button>
-                                                    <button class="btn btn-sm btn-info reset-password-btn" data-user-id="{{ user._id }}">
-                                                        <i class="fas fa-key"></i> Reset Password
-                                                    </button>
-                                                    <button class="btn btn-sm btn-danger delete-user-btn" data-user-id="{{ user._id }}">
-                                                        <i class="fas fa-trash"></i> Delete
-                                                    </button>
-                                                </td>
-                                            </tr>
-                                            {% endfor %}
-                                        </tbody>
+                                        <tbody id="usersTable"></tbody>
                                     </table>
                                 </div>
+                                <div class="text-center">
+                                    <button class="btn btn-outline-secondary" id="loadMoreUsers" style="display: none;">
+                                        <i class="fas fa-chevron-down mr-2"></i>Load more
+                                    </button>
+                                    <span class="text-muted" id="noUsers" style="display: none;">No users found</span>
+                                </div>
                             </div>
                         </div>
                     </div>
@@ -2413,6 +4154,61 @@ def manage_users():
             <script src="https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/js/bootstrap.bundle.min.js"></script>
             <script>
             $(document).ready(function() {
+                // Users are fetched a page at a time; the full document is only loaded when editing
+                let nextUsersCursor = null;
+                let userSearchTimer = null;
+
+                function userRow(user) {
+                    const badge = $('<span class="badge">')
+                        .addClass(user.role === 'admin' ? 'badge-danger' : 'badge-primary')
+                        .text(user.role.charAt(0).toUpperCase() + user.role.slice(1));
+                    const actions = $('<td>').append(
+                        $('<button class="btn btn-sm btn-warning edit-user-btn mr-1"><i class="fas fa-edit"></i> Edit</button>').attr('data-user-id', user._id),
+                        $('<button class="btn btn-sm btn-info reset-password-btn mr-1"><i class="fas fa-key"></i> Reset Password</button>').attr('data-user-id', user._id),
+                        $('<button class="btn btn-sm btn-danger delete-user-btn"><i class="fas fa-trash"></i> Delete</button>').attr('data-user-id', user._id)
+                    );
+                    return $('<tr>').attr('data-user-id', user._id).append(
+                        $('<td>').text(user.username),
+                        $('<td>').append(badge),
+                        actions
+                    );
+                }
+
+                function loadUsers(reset) {
+                    const params = {search: $('#userSearch').val()};
+                    if (!reset && nextUsersCursor) {
+                        params.after = nextUsersCursor;
+                    }
+                    $.ajax({
+                        url: '/api/users',
+                        method: 'GET',
+                        data: params,
+                        success: function(response) {
+                            if (!response.success) {
+                                alert('Error: ' + response.message);
+                                return;
+                            }
+                            if (reset) {
+                                $('#usersTable').empty();
+                            }
+                            response.users.forEach(user => $('#usersTable').append(userRow(user)));
+                            nextUsersCursor = response.next;
+                            $('#loadMoreUsers').toggle(!!response.next);
+                            $('#noUsers').toggle($('#usersTable tr').length === 0);
+                        },
+                        error: function() {
+                            alert('Error loading users');
+                        }
+                    });
+                }
+
+                $('#userSearch').on('input', function() {
+                    clearTimeout(userSearchTimer);
+                    userSearchTimer = setTimeout(() => loadUsers(true), 300);
+                });
+                $('#loadMoreUsers').on('click', () => loadUsers(false));
+                loadUsers(true);
+
                 // Add new user
                 $('#addUserForm').on('submit', function(e) {
                     e.preventDefault();
@@ -2460,7 +4256,7 @@ def manage_users():
                 });
                 
                 // Edit user
-                $('.edit-user-btn').on('click', function() {
+                $('#usersTable').on('click', '.edit-user-btn', function() {
                     const userId = $(this).data('user-id');
                     
                     $.ajax({
@@ -2542,7 +4338,7 @@ def manage_users():
                 });
                 
                 // Reset password
-                $('.reset-password-btn').on('click', function() {
+                $('#usersTable').on('click', '.reset-password-btn', function() {
                     const userId = $(this).data('user-id');
                     const newPassword = prompt('Enter new password:');
                     
@@ -2567,7 +4363,7 @@ def manage_users():
                 });
                 
                 // Delete user
-                $('.delete-user-btn').on('click', function() {
+                $('#usersTable').on('click', '.delete-user-btn', function() {
                     const userId = $(this).data('user-id');
                     
                     if (confirm('Are you sure you want to delete this user?')) {
@@ -2592,7 +4388,7 @@ def manage_users():
             </script>
         </body>
         </html>
-    ''', users=users, location_columns=location_columns, location_values=location_values, all_columns=all_columns, session=session)
+    ''', location_columns=location_columns, location_values=location_values, all_columns=all_columns, session=session)
 
 # User Management API Routes
 @app.route('/api/users', methods=['POST'])
@@ -2615,7 +4411,11 @@ def create_user():
             "column_permissions": data.get('column_permissions', [])
         }
         
-        result = users_collection.insert_one(user_doc)
+        try:
+            result = users_collection.insert_one(user_doc)
+        except DuplicateKeyError:
+            return jsonify({"success": False, "message": "Username already exists"}), 400
+        bump_users_version()
         
         if result.inserted_id:
             return jsonify({"success": True, "message": "User created successfully"})
@@ -2625,6 +4425,42 @@ def create_user():
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
+USERS_PAGE_SIZE = 50
+USERS_PAGE_MAX = 500
+
+@app.route('/api/users', methods=['GET'])
+@login_required
+@admin_required
+def list_users():
+    """List users by username with keyset pagination, without their permission maps"""
+    try:
+        search = request.args.get('search', '').strip()
+        after = request.args.get('after')
+        try:
+            limit = int(request.args.get('limit', USERS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"success": False, "message": "limit must be a whole number"}), 400
+        limit = max(1, min(limit, USERS_PAGE_MAX))
+
+        query = {}
+        if search:
+            query["username"] = {"$regex": re.escape(search), "$options": "i"}
+        if after:
+            query.setdefault("username", {})["$gt"] = after
+
+        cursor = users_collection.find(query, {"username": 1, "role": 1}).sort("username", 1).limit(limit + 1)
+        users = [{"_id": str(user['_id']), "username": user['username'], "role": user.get('role', 'user')} for user in cursor]
+
+        # One extra row tells us whether another page exists
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = users[-1]['username']
+        return jsonify({"success": True, "users": users, "next": next_cursor})
+    except Exception as e:
+        print(f"Error listing users: {e}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @app.route('/api/users/<user_id>', methods=['GET'])
 @login_required
 @admin_required
@@ -2658,10 +4494,14 @@ def update_user(user_id):
             "column_permissions": data.get('column_permissions', [])
         }
         
-        result = users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": update_data}
-        )
+        try:
+            result = users_collection.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$set": update_data}
+            )
+        except DuplicateKeyError:
+            return jsonify({"success": False, "message": "Username already exists"}), 400
+        bump_users_version()
         
         if result.matched_count > 0:
             return jsonify({"success": True, "message": "User updated successfully"})
@@ -2682,6 +4522,7 @@ def reset_user_password(user_id):
             {"_id": ObjectId(user_id)},
             {"$set": {"password": data['password']}}  # In production, hash this password
         )
+        bump_users_version()
         
         if result.matched_count > 0:
             return jsonify({"success": True, "message": "Password reset successfully"})
@@ -2697,6 +4538,7 @@ def reset_user_password(user_id):
 def delete_user(user_id):
     try:
         result = users_collection.delete_one({"_id": ObjectId(user_id)})
+        bump_users_version()
         
         if result.deleted_count > 0:
             return jsonify({"success": True, "message": "User deleted successfully"})
@@ -2840,14 +4682,17 @@ if __name__ == '__main__':
         print("\nPress Ctrl+C to stop the server")
     
     # Configuration
-    PORT = 5000
+    PORT = int(os.getenv("ICT_PORT", "5000"))
     HOST = "0.0.0.0"  # Allow external connections
     
-    # Check if ngrok is available
-    print("🔍 Checking for ngrok...")
-    ngrok_available = check_ngrok_installed()
+    # Check if ngrok is available (ICT_NO_NGROK=1 skips the tunnel, e.g. for local benchmarks)
     public_url = None
     ngrok_process = None
+    if os.getenv("ICT_NO_NGROK"):
+        ngrok_available = False
+    else:
+        print("🔍 Checking for ngrok...")
+        ngrok_available = check_ngrok_installed()
     
     if ngrok_available:
         print("🔍 Starting ngrok tunnel...")
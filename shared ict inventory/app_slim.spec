@@ -0,0 +1,62 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Slim, fast-starting build: pyinstaller app_slim.spec  ->  dist/ict-inventory/
+#
+# onedir instead of onefile: nothing is unpacked to a temp folder on every launch.
+# Only the packages app.py actually uses are bundled. Parquet export needs pyarrow
+# (and numpy); without them it answers 501 and CSV/XLSX exports keep working.
+# The async server (asgi.py) and the upload scripts are not part of this build.
+
+excludes = [
+    # Data stack: app.py no longer uses pandas, Parquet export is optional
+    'pandas', 'numpy', 'pyarrow', 'scipy', 'matplotlib',
+    # Async/production servers and the Firestore uploaders
+    'motor', 'uvicorn', 'starlette', 'asgiref', 'gunicorn', 'waitress',
+    'google', 'grpc', 'firebase_admin',
+    # GUI, notebook and test tooling that other installed packages may drag in
+    'tkinter', 'IPython', 'jupyter_client', 'notebook', 'pytest', 'setuptools', 'pkg_resources',
+    # Optional speedups openpyxl looks for; the pure-Python paths are used instead
+    'lxml', 'PIL',
+]
+
+a = Analysis(
+    ['app.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=excludes,
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='ict-inventory',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    # UPX-compressed binaries have to be decompressed on every start
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='ict-inventory',
+)
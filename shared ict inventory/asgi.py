@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+ICT Inventory - Async Server
+Serves the heavy read endpoints (/data, /get_columns and CSV downloads) with the async Motor
+driver, so a client waiting on a slow link holds a coroutine instead of an OS thread. Every
+other route is handed to the Flask app unchanged, which runs in uvicorn's thread pool.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+    python asgi.py
+
+Login sessions and permissions are shared with the Flask app: the session cookie is looked up
+in the same server-side session store and the role comes from the same user directory.
+"""
+
+import os
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import g
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, RedirectResponse, Response, StreamingResponse
+
+import app as inventory
+
+flask_application = WsgiToAsgi(inventory.app)
+
+# Created on first use, i.e. inside each uvicorn worker process after it has started
+motor_client = None
+
+
+def get_motor_collection():
+    """Return the inventory collection on the async client"""
+    global motor_client
+    if motor_client is None:
+        motor_client = AsyncIOMotorClient(inventory.MONGO_URI, event_listeners=[inventory.pool_metrics],
+                                          **inventory.mongo_client_options())
+    return motor_client[inventory.MONGO_DB_NAME][inventory.MONGO_COLLECTION_NAME]
+
+
+def load_user_access(request):
+    """Resolve the session cookie to the user's access, like the Flask before_request hook (None if logged out)"""
+    session = inventory.app.session_interface.open_session(inventory.app, request)
+    username = session.get('username')
+    if not username:
+        return None
+    return inventory.resolve_user_access(username, session.get('builtin', username in inventory.USERS))
+
+
+def call_as_user(access, func, *args):
+    """Call an app.py helper that reads the current user from flask.g"""
+    with inventory.app.app_context():
+        g.role = access['role']
+        g.location_permissions = access['location_permissions']
+        g.column_permissions = access['column_permissions']
+        return func(*args)
+
+
+def json_response(payload, status_code=200):
+    """Encode with Flask's JSON provider so responses match the WSGI endpoints exactly"""
+    return Response(inventory.app.json.dumps(payload), status_code=status_code, media_type="application/json")
+
+
+async def data(request, access):
+    """Async /data: the scan runs on Motor, the row shaping in the thread pool"""
+    try:
+        # DataTables posts a urlencoded form; parse it directly rather than pull in python-multipart
+        form = dict(parse_qsl((await request.body()).decode('utf-8')))
+        draw = int(form.get('draw', 1))
+        query = call_as_user(access, inventory.build_data_query, form)
+        projection = dict(inventory.HIDDEN_PROJECTION)
+        if access['role'] != 'admin':
+            projection["_id"] = 0
+        data_list = await get_motor_collection().find(query, projection).to_list(length=None)
+        payload = await run_in_threadpool(call_as_user, access, inventory.build_data_payload, data_list, draw)
+        return json_response(payload)
+    except Exception as e:
+        print(f"Error processing async data request: {str(e)}")
+        return json_response(inventory.data_error_payload(e))
+
+
+async def get_columns(request, access):
+    """Async /get_columns"""
+    try:
+        sample_doc = await get_motor_collection().find_one({}, {"_id": 0, **inventory.HIDDEN_PROJECTION})
+        if sample_doc:
+            return json_response({"success": True, "columns": list(sample_doc.keys())})
+        return json_response({"success": False, "message": "No data found"}, 404)
+    except Exception as e:
+        return json_response({"success": False, "message": str(e)}, 500)
+
+
+async def iter_csv_export(cursor, columns, cache_path):
+    """app.iter_csv_export wrapped in app.tee_to_export_cache, over an async cursor"""
+    chunks = inventory.CsvExportChunks(columns)
+    cache = inventory.ExportCacheWriter(cache_path)
+    try:
+        # Send the header straight away so the download starts immediately
+        yield cache.write(chunks.header())
+        async for doc in cursor:
+            chunk = chunks.add(doc)
+            if chunk:
+                yield cache.write(chunk)
+        chunk = chunks.take()
+        if chunk:
+            yield cache.write(chunk)
+        cache.commit()
+    finally:
+        cache.discard()
+
+
+async def download(request, access):
+    """Async /download for CSV cache misses; cached files and XLSX/Parquet builds stay on Flask"""
+    try:
+        export = await run_in_threadpool(call_as_user, access, inventory.resolve_export, request.query_params)
+    except inventory.ExportRequestError as e:
+        return PlainTextResponse(str(e), status_code=e.status)
+    if export['format'] != 'csv' or os.path.isfile(export['cache_path']):
+        # Conditional GET and Range requests are already handled by send_file
+        return None
+
+    cursor = get_motor_collection().find(export['query'], inventory.export_projection(export),
+                                         batch_size=inventory.EXPORT_BATCH_SIZE)
+    if export['sort']:
+        cursor = cursor.sort(export['sort'])
+    return StreamingResponse(
+        iter_csv_export(cursor, export['columns'], export['cache_path']),
+        media_type=inventory.EXPORT_MIMETYPES['csv'],
+        headers={'Content-Disposition': 'attachment; filename=ICT_Inventory_mongodb.csv'}
+    )
+
+
+ASYNC_ROUTES = {
+    ('POST', '/data'): data,
+    ('GET', '/get_columns'): get_columns,
+    ('GET', '/download'): download,
+}
+
+
+async def application(scope, receive, send):
+    """ASGI entry point: async read routes first, everything else goes to Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if motor_client is not None:
+                    motor_client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = ASYNC_ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if handler is not None:
+        request = Request(scope, receive)
+        access = await run_in_threadpool(load_user_access, request)
+        if access is None:
+            response = RedirectResponse('/login', status_code=302)
+        else:
+            response = await handler(request, access)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+    await flask_application(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("asgi:application", host=os.getenv("ICT_HOST", "0.0.0.0"), port=int(os.getenv("ICT_PORT", "5000")),
+                workers=int(os.getenv("ICT_WORKERS", "1")))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+ICT Inventory - Frozen Build Startup Benchmark
+Launches a PyInstaller build several times and measures how long it takes until /healthz answers.
+The ngrok tunnel is skipped (ICT_NO_NGROK=1) so only the app's own startup is measured.
+
+    pyinstaller app_slim.spec
+    python bench_frozen.py                                   # dist/ict-inventory/ict-inventory
+    python bench_frozen.py dist/app.exe dist/ict-inventory/ict-inventory.exe --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BINARY = os.path.join(APP_DIR, "dist", "ict-inventory", "ict-inventory" + (".exe" if sys.platform == "win32" else ""))
+
+
+def folder_size(path):
+    """Size on disk of a onedir build (or of a single onefile executable)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def time_startup(binary, port, timeout):
+    """Start the binary and return seconds until /healthz responds"""
+    env = dict(os.environ, ICT_NO_NGROK="1", ICT_PORT=str(port))
+    started = time.perf_counter()
+    process = subprocess.Popen([binary], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{binary} exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError(f"{binary} did not answer /healthz within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-response of frozen ICT Inventory builds")
+    parser.add_argument("binaries", nargs="*", default=[DEFAULT_BINARY], help="executables to compare")
+    parser.add_argument("--runs", type=int, default=3, help="launches per binary (the first one is a cold start)")
+    parser.add_argument("--port", type=int, default=5200)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{'binary':<50} {'size MB':>8} {'cold s':>7} {'warm s':>7}")
+    print("-" * 75)
+    for binary in args.binaries:
+        build = os.path.dirname(binary) if os.path.basename(os.path.dirname(binary)) != "dist" else binary
+        timings = [time_startup(binary, args.port, args.timeout) for _ in range(args.runs)]
+        warm = statistics.median(timings[1:]) if len(timings) > 1 else timings[0]
+        print(f"{os.path.relpath(binary)[-50:]:<50} {folder_size(build) / 1e6:>8.1f} {timings[0]:>7.2f} {warm:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+ICT Inventory - Import-Time Report
+Runs `python -X importtime -c "import app"` in a fresh interpreter and prints the slowest
+modules as a table, so it is easy to see what app.py pulls in at startup.
+
+    python importtime_report.py               # top 25 by cumulative time
+    python importtime_report.py --top 50 --sort self
+    python importtime_report.py --module asgi
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+UNREACHABLE_MONGO_URI = "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=60000"
+
+# "import time:       805 |      55373 |     flask.app"
+IMPORTTIME_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)\s*$')
+
+
+def collect_import_times(module, env):
+    """Return a list of (module, self_us, cumulative_us) for a cold import of module"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=APP_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def top_level_packages(entries):
+    """Sum self time per top-level package (flask, pymongo, ...)"""
+    totals = {}
+    for name, self_us, _ in entries:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which imports make app.py slow to start")
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--top", type=int, default=25, help="rows to show")
+    parser.add_argument("--sort", choices=["cumulative", "self"], default="cumulative")
+    parser.add_argument("--use-configured-mongo", action="store_true",
+                        help="keep MONGO_URI from the environment instead of an unreachable address")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.use_configured_mongo:
+        env["MONGO_URI"] = UNREACHABLE_MONGO_URI
+
+    entries = collect_import_times(args.module, env)
+    total_us = next((cumulative for name, _, cumulative in entries if name == args.module), 0)
+    sort_index = 2 if args.sort == "cumulative" else 1
+    rows = sorted(entries, key=lambda entry: entry[sort_index], reverse=True)[:args.top]
+
+    print(f"Cold import of '{args.module}': {total_us / 1000:.1f} ms across {len(entries)} modules\n")
+    print(f"{'module':<50} {'self ms':>9} {'cumul ms':>9} {'% total':>8}")
+    print("-" * 79)
+    for name, self_us, cumulative_us in rows:
+        share = cumulative_us * 100 / total_us if total_us else 0
+        print(f"{name[:50]:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f} {share:>7.1f}%")
+
+    print(f"\n{'package':<50} {'self ms':>9}")
+    print("-" * 60)
+    for package, self_us in top_level_packages(entries)[:10]:
+        print(f"{package:<50} {self_us / 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
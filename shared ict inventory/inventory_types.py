@@ -0,0 +1,224 @@
+"""
+ICT Inventory - Typed Fields
+Value typing shared by the web app (app.py) and the upload scripts, so every import path writes
+exactly the same documents:
+
+- typed copies of text columns, kept under TYPED_FIELD (hidden from the grid) so they can be
+  range-queried and indexed while the original text is still what users see
+- the content hash an upsert resync stores under IMPORT_HASH_FIELD (also hidden), which any
+  other write drops so the next resync rewrites that row
+- CSV cell coercion that reproduces pandas.read_csv, which wrote the existing inventory
+"""
+
+import datetime
+import re
+
+TYPED_FIELD = "_typed"
+IMPORT_HASH_FIELD = "_import_hash"
+
+# Exclusion projection that keeps the hidden bookkeeping fields out of the grid, columns and exports
+HIDDEN_PROJECTION = {TYPED_FIELD: 0, IMPORT_HASH_FIELD: 0}
+
+PURCHASE_DATE_FORMATS = ["%A, %B %d, %Y", "%B %d, %Y", "%B %d %Y", "%d-%b-%y", "%d/%m/%y", "%d/%m/%Y", "%Y-%m-%d"]
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+
+def parse_purchase_date(value):
+    """Parse the free-text purchase date (several formats plus Excel serial numbers); None if unknown"""
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value:
+        # Dates pasted from Excel sometimes arrive as serial day numbers
+        if 20000 <= value <= 80000:
+            return EXCEL_EPOCH + datetime.timedelta(days=int(value))
+        return None
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    if text.isdigit():
+        return parse_purchase_date(int(text))
+    for date_format in PURCHASE_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format)
+        except ValueError:
+            pass
+    return None
+
+
+def parse_purchase_price(value):
+    """Parse prices such as '$1,200.00 ' or the accounting zero ' $-   '; None if unknown"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value == value else None
+    if not isinstance(value, str):
+        return None
+    text = value.replace('$', '').replace(',', '').strip()
+    if text == '-':
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+# Source column -> (key under TYPED_FIELD, parser)
+TYPED_COLUMNS = {
+    "Purchase date": ("purchase_date", parse_purchase_date),
+    "Purchase\nprice (TTC)": ("purchase_price", parse_purchase_price),
+}
+
+
+def typed_fields(fields):
+    """Typed values for any typed source columns present in fields, e.g. {'purchase_date': datetime}"""
+    typed = {}
+    for column, (typed_key, parser) in TYPED_COLUMNS.items():
+        if column in fields:
+            typed[typed_key] = parser(fields[column])
+    return typed
+
+
+def with_typed_fields(doc):
+    """Return a copy of a new document with its typed shadow values filled in (and no import hash)"""
+    typed = {key: value for key, value in typed_fields(doc).items() if value is not None}
+    doc = {key: value for key, value in doc.items() if key not in HIDDEN_PROJECTION}
+    if typed:
+        doc[TYPED_FIELD] = typed
+    return doc
+
+
+def typed_update(fields, import_hash=None):
+    """Build a $set/$unset update for fields that keeps the typed shadow values in sync.
+
+    Only an upsert resync passes import_hash; every other write drops the stored hash.
+    """
+    fields = {key: value for key, value in fields.items() if key not in HIDDEN_PROJECTION}
+    update = {"$set": dict(fields)}
+    unset = {}
+    if import_hash is None:
+        unset[IMPORT_HASH_FIELD] = ""
+    else:
+        update["$set"][IMPORT_HASH_FIELD] = import_hash
+    for typed_key, value in typed_fields(fields).items():
+        if value is None:
+            unset[f"{TYPED_FIELD}.{typed_key}"] = ""
+        else:
+            update["$set"][f"{TYPED_FIELD}.{typed_key}"] = value
+    if unset:
+        update["$unset"] = unset
+    return update
+
+
+def typed_range_conditions(params):
+    """MongoDB conditions for the purchased_from/to (YYYY-MM-DD) and price_min/max parameters.
+
+    They run against the indexed typed copies; raises ValueError on a malformed bound.
+    """
+    conditions = []
+    purchase_date_range = {}
+    if params.get('purchased_from'):
+        purchase_date_range["$gte"] = datetime.datetime.strptime(params['purchased_from'], "%Y-%m-%d")
+    if params.get('purchased_to'):
+        purchase_date_range["$lt"] = datetime.datetime.strptime(params['purchased_to'], "%Y-%m-%d") + datetime.timedelta(days=1)
+    if purchase_date_range:
+        conditions.append({f"{TYPED_FIELD}.purchase_date": purchase_date_range})
+    price_range = {}
+    if params.get('price_min') not in (None, ''):
+        price_range["$gte"] = float(params['price_min'])
+    if params.get('price_max') not in (None, ''):
+        price_range["$lte"] = float(params['price_max'])
+    if price_range:
+        conditions.append({f"{TYPED_FIELD}.purchase_price": price_range})
+    return conditions
+
+
+# pandas.read_csv infers each column's type per chunk of rows, so every reader uses the same chunk size
+CSV_CHUNK_ROWS = 10000
+
+# pandas' default na_values
+CSV_NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+CSV_TRUE_VALUES = {"True", "TRUE", "true"}
+CSV_FALSE_VALUES = {"False", "FALSE", "false"}
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+CSV_INTEGER_RE = re.compile(r'^[ \t]*[-+]?[0-9]+[ \t]*$')
+CSV_FLOAT_RE = re.compile(r'^[ \t]*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?[ \t]*$|^[-+]?(inf|infinity)$', re.IGNORECASE)
+
+
+def csv_header(header):
+    """Column names as pandas.read_csv reports them: blanks become 'Unnamed: i', repeats get '.1', '.2', ..."""
+    names = []
+    seen = {}
+    for i, name in enumerate(header):
+        name = name or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def is_blank_csv_row(row):
+    """pandas skips empty and whitespace-only lines (but not '""' or ',,' rows of empty cells)"""
+    return not row or (len(row) == 1 and isinstance(row[0], str) and row[0] != '' and not row[0].strip())
+
+
+def csv_value_kind(value):
+    """Classify one non-missing cell as 'int', 'bigint' (beyond 64 bits), 'float', 'bool' or 'other'"""
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if INT64_MIN <= value <= INT64_MAX else 'bigint'
+    if isinstance(value, float):
+        return 'float'
+    if not isinstance(value, str):
+        return 'other'
+    if CSV_INTEGER_RE.match(value):
+        return 'int' if INT64_MIN <= int(value) <= INT64_MAX else 'bigint'
+    if CSV_FLOAT_RE.match(value):
+        return 'float'
+    if value in CSV_TRUE_VALUES or value in CSV_FALSE_VALUES:
+        return 'bool'
+    return 'other'
+
+
+def coerce_csv_column(values):
+    """Type one column of a chunk the way pandas.read_csv does.
+
+    Missing cells become NaN. A column of whole numbers stays int unless it has missing cells,
+    in which case it becomes float (so '007' -> 7, or 7.0 next to a blank). Numbers mixed with
+    text leave the whole column as the original text, and True/False columns become bools.
+    Whole numbers too long for 64 bits (e.g. SIM card ICCIDs) stay Python ints, or text when mixed
+    with decimals (pandas' result then depends on row order). Text cells are parsed with float(),
+    which matches pandas for up to 15 significant digits.
+    """
+    missing = [value is None or value != value or (isinstance(value, str) and value in CSV_NA_VALUES) for value in values]
+    kinds = {csv_value_kind(value) for value, is_missing in zip(values, missing) if not is_missing}
+    has_missing = any(missing)
+    nan = float('nan')
+
+    if kinds and kinds <= {'int'} and not has_missing:
+        return [int(value) for value in values]
+    if 'bigint' in kinds and kinds <= {'int', 'bigint'}:
+        return [nan if is_missing else int(value) for value, is_missing in zip(values, missing)]
+    if kinds <= {'int', 'float'}:
+        return [nan if is_missing else float(value) for value, is_missing in zip(values, missing)]
+    if kinds == {'bool'}:
+        return [nan if is_missing else (value if isinstance(value, bool) else value in CSV_TRUE_VALUES)
+                for value, is_missing in zip(values, missing)]
+    return [nan if is_missing else value for value, is_missing in zip(values, missing)]
+
+
+def coerce_csv_rows(header, rows):
+    """Turn one chunk of raw CSV rows into documents, typed column by column like pandas.read_csv.
+
+    Short rows are padded with missing cells. Blank rows should already have been dropped
+    (is_blank_csv_row) so chunk boundaries line up with pandas' chunksize.
+    """
+    columns = [coerce_csv_column([row[i] if i < len(row) else None for row in rows]) for i in range(len(header))]
+    return [dict(zip(header, values)) for values in zip(*columns)] if header else [{} for _ in rows]
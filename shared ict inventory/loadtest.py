@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+ICT Inventory - Load Test
+Hammers the dashboard read endpoints with concurrent logged-in clients and reports throughput
+and latency percentiles.
+
+    python loadtest.py --url http://localhost:5000
+    python loadtest.py --compare             # Werkzeug dev server vs serve.py, same load
+
+--compare starts both servers itself (on --port and --port + 1) against the configured MongoDB.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# DataTables' first-page request, as sent by the dashboard
+DATA_FORM = {"draw": "1", "start": "0", "length": "50", "search[value]": ""}
+
+
+def login(base_url, username, password):
+    """Return a requests session logged in to the app"""
+    client = requests.Session()
+    response = client.post(f"{base_url}/login", data={"username": username, "password": password}, allow_redirects=False)
+    if response.status_code != 302:
+        raise RuntimeError(f"Login failed for {username} ({response.status_code})")
+    return client
+
+
+def run_client(base_url, username, password, requests_per_client):
+    """One simulated user: log in, then alternate /data and /get_columns; returns (latencies, errors)"""
+    client = login(base_url, username, password)
+    latencies = []
+    errors = 0
+    for i in range(requests_per_client):
+        started = time.perf_counter()
+        try:
+            if i % 2 == 0:
+                response = client.post(f"{base_url}/data", data=DATA_FORM, timeout=60)
+            else:
+                response = client.get(f"{base_url}/get_columns", timeout=60)
+            if response.status_code != 200:
+                errors += 1
+        except requests.RequestException:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    return latencies, errors
+
+
+def run_load(base_url, clients, requests_per_client, username, password):
+    """Run the load and return a summary dict"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(run_client, base_url, username, password, requests_per_client) for _ in range(clients)]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0,
+        "p50_ms": percentile(50) if latencies else 0,
+        "p95_ms": percentile(95) if latencies else 0,
+        "p99_ms": percentile(99) if latencies else 0,
+    }
+
+
+def print_summary(name, summary):
+    print(f"{name:<12} {summary['requests']:>8} {summary['errors']:>7} {summary['rps']:>9.1f} "
+          f"{summary['mean_ms']:>9.1f} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}")
+
+
+def print_header():
+    print(f"{'server':<12} {'requests':>8} {'errors':>7} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+
+def wait_until_up(base_url, timeout=60):
+    """Poll the login page until the server answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/login", timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise RuntimeError(f"{base_url} did not start within {timeout}s")
+
+
+def start_server(server, port, extra_args):
+    """Start serve.py with the given server backend in a subprocess"""
+    command = [sys.executable, os.path.join(APP_DIR, "serve.py"), "--server", server, "--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen(command + extra_args, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ICT Inventory read endpoints")
+    parser.add_argument("--url", default="http://localhost:5000", help="server to test (ignored with --compare)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=20, help="requests per user")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--compare", action="store_true", help="compare the Werkzeug dev server with serve.py")
+    parser.add_argument("--port", type=int, default=5100, help="first port used by --compare")
+    parser.add_argument("--server", default="auto", help="serve.py backend to compare against (--compare)")
+    parser.add_argument("--workers", type=int, default=4, help="serve.py workers (--compare)")
+    parser.add_argument("--threads", type=int, default=8, help="serve.py threads per worker (--compare)")
+    args = parser.parse_args()
+
+    if not args.compare:
+        print_header()
+        print_summary(args.url, run_load(args.url, args.clients, args.requests, args.username, args.password))
+        return
+
+    print(f"⚙️  {args.clients} clients x {args.requests} requests against each server")
+    candidates = [
+        ("werkzeug", args.port, []),
+        (args.server, args.port + 1, ["--workers", str(args.workers), "--threads", str(args.threads)]),
+    ]
+    results = []
+    for server, port, extra_args in candidates:
+        process = start_server(server, port, extra_args)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(base_url)
+            results.append((server, run_load(base_url, args.clients, args.requests, args.username, args.password)))
+        finally:
+            process.terminate()
+            process.wait()
+
+    print_header()
+    for server, summary in results:
+        print_summary(server, summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+ICT Inventory - Production Server
+Runs the Flask app under a production WSGI server instead of Werkzeug's development server.
+
+    python serve.py                          # gunicorn on Linux/macOS, waitress on Windows
+    python serve.py --workers 4 --threads 8
+    python serve.py --server werkzeug        # the old `python app.py` server, for comparison
+
+Settings can also come from the environment: ICT_HOST, ICT_PORT, ICT_WORKERS, ICT_THREADS,
+ICT_TIMEOUT, ICT_GRACEFUL_TIMEOUT.
+
+The export/import job limits in app.py apply per worker process. Under gunicorn the export
+limits default to the single-process budget divided by --workers (at least 1 each); set
+EXPORT_MAX_WORKERS / EXPORT_MAX_PENDING_JOBS to override them per worker.
+
+gunicorn imports app.py inside each worker (no preloading), so every worker process creates
+its own MongoClient after the fork. Send SIGHUP to the master process for a graceful reload:
+new workers start with freshly imported code while the old ones finish their requests.
+waitress runs a single process (Windows has no fork), so --workers is ignored there.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+
+def default_workers():
+    """gunicorn's usual recommendation: (2 x CPU cores) + 1"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+# Site-wide background export budget (app.py's single-process defaults)
+EXPORT_THREADS_TOTAL = 2
+EXPORT_PENDING_TOTAL = 10
+
+
+def size_export_limits(workers):
+    """Split the export budget across worker processes; explicit EXPORT_MAX_* settings win.
+
+    app.py's export pool and queue limit are per process, so without this every gunicorn
+    worker would run its own 2 exports and queue 10 more.
+    """
+    os.environ.setdefault("EXPORT_MAX_WORKERS", str(max(1, EXPORT_THREADS_TOTAL // workers)))
+    os.environ.setdefault("EXPORT_MAX_PENDING_JOBS", str(max(1, EXPORT_PENDING_TOTAL // workers)))
+    export_workers = int(os.environ["EXPORT_MAX_WORKERS"])
+    pending_jobs = int(os.environ["EXPORT_MAX_PENDING_JOBS"])
+    print(f"   Exports: {export_workers} thread(s) and {pending_jobs} queued job(s) per worker "
+          f"(up to {export_workers * workers} running / {pending_jobs * workers} queued in total)")
+
+
+def serve_gunicorn(host, port, workers, threads, timeout, graceful_timeout):
+    """Run the app under gunicorn with gthread workers"""
+    from gunicorn.app.base import BaseApplication
+
+    class InventoryApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", timeout)
+            self.cfg.set("graceful_timeout", graceful_timeout)
+            # Never import the app in the master: MongoClient is not fork-safe
+            self.cfg.set("preload_app", False)
+            self.cfg.set("accesslog", "-")
+
+        def load(self):
+            from app import app
+            return app
+
+    print(f"🚀 gunicorn on http://{host}:{port} ({workers} worker(s) x {threads} thread(s))")
+    print(f"   Graceful reload: kill -HUP {os.getpid()}")
+    # Set before the workers import app.py (preload_app is off)
+    size_export_limits(workers)
+    InventoryApplication().run()
+
+
+def serve_waitress(host, port, threads):
+    """Run the app under waitress (single process, works on Windows)"""
+    from waitress import serve
+    from app import app
+
+    print(f"🚀 waitress on http://{host}:{port} ({threads} thread(s))")
+    serve(app, host=host, port=port, threads=threads)
+
+
+def serve_werkzeug(host, port):
+    """Run the development server exactly like `python app.py` does"""
+    from app import app
+
+    print(f"⚠️  Werkzeug development server on http://{host}:{port}")
+    app.run(host=host, port=port, debug=False, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ICT Inventory under a production WSGI server")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress", "werkzeug"], default="auto",
+                        help="auto picks gunicorn where fork is available, waitress otherwise")
+    parser.add_argument("--host", default=os.getenv("ICT_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("ICT_PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ICT_WORKERS", str(default_workers()))),
+                        help="worker processes (gunicorn only)")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("ICT_THREADS", "8")),
+                        help="threads per worker")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("ICT_TIMEOUT", "120")),
+                        help="seconds before a silent worker is restarted (gunicorn only)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("ICT_GRACEFUL_TIMEOUT", "30")),
+                        help="seconds workers get to finish requests on reload/shutdown (gunicorn only)")
+    args = parser.parse_args()
+
+    server = args.server
+    if server == "auto":
+        server = "waitress" if sys.platform == "win32" else "gunicorn"
+
+    if server == "gunicorn":
+        serve_gunicorn(args.host, args.port, args.workers, args.threads, args.timeout, args.graceful_timeout)
+    elif server == "waitress":
+        if args.workers > 1 and args.server == "waitress":
+            print("ℹ️  waitress runs a single process; --workers is ignored")
+        serve_waitress(args.host, args.port, args.threads)
+    else:
+        serve_werkzeug(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nothing listens on port 9, so the tests never need (or touch) a real MongoDB
+UNREACHABLE_MONGO_URI = "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=60000"
+os.environ["MONGO_URI"] = UNREACHABLE_MONGO_URI
+os.environ.setdefault("MONGO_CHECK_INTERVAL_SECONDS", "3600")
+os.environ.setdefault("SESSION_DB_PATH", os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"))
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+# The upload script lives next to the app, in "New folder"
+UPLOADER_DIR = os.path.join(APP_DIR, "New folder")
+if UPLOADER_DIR not in sys.path:
+    sys.path.insert(0, UPLOADER_DIR)
+
+
+@pytest.fixture
+def uploader_db(monkeypatch):
+    """An in-memory database the upload script writes to instead of localhost"""
+    mongomock = pytest.importorskip("mongomock")
+    pytest.importorskip("pandas")
+    import upload_csv_to_firestore as uploader
+
+    db = mongomock.MongoClient()["afrahkoum"]
+    monkeypatch.setattr(uploader, "init_mongodb", lambda: db)
+    return db
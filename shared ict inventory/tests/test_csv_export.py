@@ -0,0 +1,55 @@
+"""The WSGI and ASGI CSV downloads produce the same bytes and the same cached file"""
+import asyncio
+import os
+
+import pytest
+
+DOCS = [{"ID": i, "Model": f"Latitude {i}", "Notes": float('nan') if i % 3 else "a,b"} for i in range(7)]
+COLUMNS = ["ID", "Model", "Notes"]
+
+
+class AsyncCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    import app
+
+    monkeypatch.setattr(app, "EXPORT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "EXPORT_BATCH_SIZE", 3)
+    return tmp_path
+
+
+def test_async_export_matches_wsgi_export(cache_dir):
+    pytest.importorskip("motor")
+    import app
+    import asgi
+
+    sync_chunks = list(app.tee_to_export_cache(app.iter_csv_export(iter(DOCS), COLUMNS), str(cache_dir / "sync.csv")))
+
+    async def collect():
+        return [chunk async for chunk in asgi.iter_csv_export(AsyncCursor(DOCS), COLUMNS, str(cache_dir / "async.csv"))]
+
+    async_chunks = asyncio.run(collect())
+    assert async_chunks == sync_chunks
+    assert len(sync_chunks) == 4  # header, then batches of 3, 3 and 1 rows
+    assert (cache_dir / "sync.csv").read_bytes() == (cache_dir / "async.csv").read_bytes() == "".join(sync_chunks).encode()
+
+
+def test_interrupted_download_is_not_cached(cache_dir):
+    import app
+
+    stream = app.tee_to_export_cache(app.iter_csv_export(iter(DOCS), COLUMNS), str(cache_dir / "cut.csv"))
+    next(stream)
+    stream.close()
+    assert os.listdir(cache_dir) == []
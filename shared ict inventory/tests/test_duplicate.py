@@ -0,0 +1,42 @@
+"""/records/duplicate rejects malformed input with a 400"""
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(app, "mongo_collection", db.ict_inventory)
+    monkeypatch.setattr(app, "metadata_collection", db.metadata)
+    monkeypatch.setattr(app, "location_catalogue_collection", db.location_catalogue)
+    client = app.app.test_client()
+    client.post('/login', data={"username": "admin", "password": "admin123"})
+    client.record_id = str(db.ict_inventory.insert_one({"Model": "Latitude", "Location": "Tunis"}).inserted_id)
+    return client
+
+
+@pytest.mark.parametrize("payload", [
+    ["not", "an", "object"],
+    {"ids": "abc"},
+    {"ids": ["not-an-object-id"]},
+    {"ids": [42]},
+    {"ids": "RECORD", "overrides": ["Model", "X"]},
+    {"ids": "RECORD", "overrides": {"_id": "x"}},
+    {"ids": "RECORD", "overrides": {"$set": "x"}},
+])
+def test_bad_input_is_rejected(client, payload):
+    if isinstance(payload, dict) and payload.get("ids") == "RECORD":
+        payload = dict(payload, ids=[client.record_id])
+    response = client.post('/records/duplicate', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_duplicate_applies_overrides(client):
+    import app
+
+    response = client.post('/records/duplicate', json={"ids": [client.record_id], "overrides": {"Location": "Sfax"}})
+    assert response.status_code == 200
+    assert sorted(doc["Location"] for doc in app.mongo_collection.find()) == ["Sfax", "Tunis"]
@@ -0,0 +1,64 @@
+"""Export queries select the same rows as the dashboard grid"""
+import pytest
+
+
+def test_search_matches_numeric_columns():
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    collection = mongomock.MongoClient().db.inventory
+    collection.insert_many([
+        {"ID": 1234, "Model": "Latitude"},
+        {"ID": 77, "Model": "X12 Carbon"},
+        {"ID": 5, "Model": "OptiPlex", "Purchase\nprice (TTC)": 120.5},
+        {"ID": 6, "Model": "Monitor", "Purchase\nprice (TTC)": float('nan')},
+    ])
+    columns = ["ID", "Model", "Purchase\nprice (TTC)"]
+
+    def ids(search):
+        query = app.build_search_condition(columns, search)
+        return sorted(doc["ID"] for doc in collection.find(query))
+
+    assert ids("12") == [5, 77, 1234]
+    assert ids("120.5") == [5]
+    assert ids("x12") == [77]
+    assert ids("nan") == []
+
+
+def test_search_matches_every_word_like_the_grid():
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    collection = mongomock.MongoClient().db.inventory
+    collection.insert_many([
+        {"ID": 1, "Brand": "Dell", "Model": 5520},
+        {"ID": 2, "Brand": "Dell", "Model": "OptiPlex 7010"},
+        {"ID": 3, "Brand": "HP", "Model": 5520},
+    ])
+    columns = ["ID", "Brand", "Model"]
+
+    def ids(search):
+        with app.app.test_request_context():
+            app.g.role, app.g.location_permissions = 'admin', {}
+            query = app.build_export_query(columns, {"search": search})
+        return sorted(doc["ID"] for doc in collection.find(query))
+
+    assert ids("dell 5520") == [1]
+    assert ids("  5520   ") == [1, 3]
+    assert ids('"optiplex 7010" dell') == [2]
+    assert ids('"dell 5520"') == []
+    assert ids("") == [1, 2, 3]
+
+
+def test_dashboards_load_shared_export_script():
+    import app
+
+    client = app.app.test_client()
+    client.post('/login', data={"username": "admin", "password": "admin123"})
+    response = client.get('/export.js')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/javascript'
+    body = response.get_data(as_text=True)
+    assert "function startExport(link, params)" in body
+    assert "function exportParams(table, columns, columnFilters, format, columnOffset)" in body
+    assert "{{" not in body
@@ -0,0 +1,79 @@
+"""Web imports: columns are named like pandas and spreadsheet cells keep the type Excel gave them"""
+import pytest
+
+
+def test_csv_header_is_named_like_pandas(tmp_path):
+    pd = pytest.importorskip("pandas")
+    import app
+
+    path = tmp_path / "inventory.csv"
+    path.write_text(" Status ,Status,,X\na,b,c,d\n")
+    records = list(app.iter_import_records(str(path), 'csv', {'progress': 0}))
+    assert list(records[0]) == list(pd.read_csv(path).columns) == [' Status ', 'Status', 'Unnamed: 2', 'X']
+    assert list(records[0].values()) == ['a', 'b', 'c', 'd']
+
+
+def test_xlsx_text_cells_keep_leading_zeros(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    import app
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Asset Tag", "Serial Number", "Qty", "In use", "Notes"])
+    sheet.append(["00123", "007", 3, "True", None])
+    sheet.append(["00124", "008", 4.5, True, ""])
+    path = str(tmp_path / "inventory.xlsx")
+    workbook.save(path)
+
+    records = list(app.iter_import_records(path, 'xlsx', {'progress': 0}))
+    assert [record["Asset Tag"] for record in records] == ["00123", "00124"]
+    assert [record["Serial Number"] for record in records] == ["007", "008"]
+    assert [record["Qty"] for record in records] == [3, 4.5]
+    assert [record["In use"] for record in records] == ["True", True]
+    assert all(record["Notes"] != record["Notes"] for record in records)
+
+
+@pytest.fixture
+def inventory(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(app, "mongo_collection", db.ict_inventory)
+    monkeypatch.setattr(app, "metadata_collection", db.metadata)
+    monkeypatch.setattr(app, "jobs_collection", db.jobs)
+    monkeypatch.setattr(app, "IMPORT_BATCH_SIZE", 2)
+    return db.ict_inventory
+
+
+def run_import(tmp_path, text, dry_run):
+    import app
+
+    path = tmp_path / "upload.csv"
+    path.write_text(text)
+    job = {
+        'id': 'test', 'format': 'csv', 'key_field': 'Serial Number', 'dry_run': dry_run,
+        'status': 'queued', 'progress': 0, 'error': None,
+        'summary': {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0,
+                    'without_key': 0, 'without_key_rows': [], 'duplicate_keys': 0, 'duplicate_key_rows': [],
+                    'new_columns': [], 'missing_columns': [], 'examples': []},
+    }
+    app.run_import_job(job, str(path))
+    return job
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_upsert_refuses_blank_and_repeated_keys(inventory, tmp_path, dry_run):
+    # The repeated key lands in a different batch than its first row
+    job = run_import(tmp_path, "Serial Number,Status\nA,x\nB,y\n,z\nC,w\nA,v\n", dry_run)
+    assert job['status'] == ('done' if dry_run else 'failed')
+    assert job['summary']['without_key_rows'] == [3]
+    assert job['summary']['duplicate_key_rows'] == [{'key': 'A', 'rows': [1, 5]}]
+    assert inventory.count_documents({}) == 0
+
+
+def test_upsert_with_unique_keys_is_written(inventory, tmp_path):
+    job = run_import(tmp_path, "Serial Number,Status\nA,x\nB,y\nC,z\n", False)
+    assert job['status'] == 'done'
+    assert job['summary']['inserted'] == 3
+    assert inventory.count_documents({}) == 3
@@ -0,0 +1,37 @@
+"""In-process registries for export and import jobs"""
+import time
+
+
+def make_job(job_id, status='queued', finished=None):
+    job = {'id': job_id, 'status': status}
+    if finished is not None:
+        job['finished'] = finished
+    return job
+
+
+def test_finished_jobs_are_pruned_after_their_own_ttl():
+    import app
+
+    registry = app.JobRegistry(ttl_seconds=60)
+    registry.add(make_job('old', 'done', finished=time.time() - 120))
+    registry.add(make_job('recent', 'done', finished=time.time() - 30))
+    registry.add(make_job('running', 'running'))
+    assert sorted(registry.jobs) == ['recent', 'running']
+
+
+def test_max_pending_only_counts_unfinished_jobs():
+    import app
+
+    registry = app.JobRegistry(ttl_seconds=60)
+    assert registry.add(make_job('a'), max_pending=2)
+    assert registry.add(make_job('b', 'done', finished=time.time()), max_pending=2)
+    assert registry.add(make_job('c', 'running'), max_pending=2)
+    assert not registry.add(make_job('d'), max_pending=2)
+    assert 'd' not in registry.jobs
+
+
+def test_import_and_export_jobs_have_separate_ttls():
+    import app
+
+    assert app.import_jobs.ttl_seconds == app.IMPORT_JOB_TTL_SECONDS
+    assert app.export_jobs.ttl_seconds == app.EXPORT_JOB_TTL_SECONDS
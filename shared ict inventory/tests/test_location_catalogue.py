@@ -0,0 +1,33 @@
+"""The location catalogue can be rebuilt by several requests at once"""
+import pytest
+
+
+@pytest.fixture
+def inventory(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(app, "mongo_collection", db.ict_inventory)
+    monkeypatch.setattr(app, "metadata_collection", db.metadata)
+    monkeypatch.setattr(app, "location_catalogue_collection", db.location_catalogue)
+    return db
+
+
+def test_rebuild_replaces_columns_in_place(inventory):
+    import app
+
+    inventory.ict_inventory.insert_many([
+        {"Location": "Tunis", "Room": "A1", "Model": "X"},
+        {"Location": "Sfax", "Room": "B2", "Model": "Y"},
+    ])
+    inventory.location_catalogue.insert_one({"_id": "Old building", "values": ["gone"]})
+
+    # A second rebuild over an existing catalogue must not hit duplicate _ids
+    app.rebuild_location_catalogue()
+    all_columns, location_columns, location_values = app.rebuild_location_catalogue()
+
+    assert location_columns == ["Location", "Room"]
+    assert location_values == {"Location": ["Sfax", "Tunis"], "Room": ["A1", "B2"]}
+    assert sorted(doc["_id"] for doc in inventory.location_catalogue.find()) == ["Location", "Room"]
+    assert app.get_location_catalogue() == (all_columns, location_columns, location_values)
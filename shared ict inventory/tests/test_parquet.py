@@ -0,0 +1,52 @@
+"""Parquet export keeps the text columns and adds typed purchase date / price columns"""
+import datetime
+
+import pytest
+
+DATE = "Purchase date"
+PRICE = "Purchase\nprice (TTC)"
+
+DOCS = [
+    {"ID": 1, DATE: "2024-03-01", PRICE: "$1,200.00",
+     "_typed": {"purchase_date": datetime.datetime(2024, 3, 1), "purchase_price": 1200.0}},
+    {"ID": 2, DATE: "unknown", PRICE: ""},
+]
+
+
+def export_table(tmp_path, columns):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import app
+
+    path = tmp_path / "export.parquet"
+    app.build_parquet_export(iter(DOCS), columns, str(path))
+    return pq.read_table(str(path))
+
+
+def test_typed_columns_are_timestamp_and_float(tmp_path):
+    table = export_table(tmp_path, ["ID", DATE, PRICE])
+    schema = {field.name: str(field.type) for field in table.schema}
+    assert schema == {
+        "ID": "string", DATE: "string", PRICE: "string",
+        "_typed.purchase_date": "timestamp[ms]", "_typed.purchase_price": "double",
+    }
+    rows = table.to_pylist()
+    assert rows[0]["_typed.purchase_date"] == datetime.datetime(2024, 3, 1)
+    assert rows[0]["_typed.purchase_price"] == 1200.0
+    assert rows[1]["_typed.purchase_date"] is None
+    assert rows[0][PRICE] == "$1,200.00"
+
+
+def test_hidden_price_column_has_no_typed_copy(tmp_path):
+    table = export_table(tmp_path, ["ID", DATE])
+    assert table.schema.names == ["ID", DATE, "_typed.purchase_date"]
+
+
+def test_parquet_import_rebuilds_typed_copies(uploader_db, tmp_path):
+    import upload_csv_to_firestore as uploader
+
+    table = export_table(tmp_path, ["ID", DATE, PRICE])
+    assert uploader.upload_parquet_to_mongodb(str(tmp_path / "export.parquet"))
+    docs = list(uploader_db.ict_inventory.find({}, {"_id": 0}))
+    assert len(docs) == table.num_rows
+    assert all(not key.startswith("_typed.") for doc in docs for key in doc)
+    assert docs[0]["_typed"] == {"purchase_date": datetime.datetime(2024, 3, 1), "purchase_price": 1200.0}
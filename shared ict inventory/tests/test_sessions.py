@@ -0,0 +1,44 @@
+"""Server-side sessions: the session id changes whenever the login state does"""
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
+
+
+def session_rows(sid):
+    import app
+    with sqlite3.connect(app.SESSION_DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessions WHERE sid = ?", (sid,)).fetchone()[0]
+
+
+def test_login_rotates_session_id(client):
+    with client.session_transaction() as session:
+        session['planted'] = True
+    before = client.get_cookie('session').value
+
+    response = client.post('/login', data={"username": "admin", "password": "admin123"})
+    assert response.status_code == 302
+    after = client.get_cookie('session').value
+
+    assert after != before
+    assert session_rows(before) == 0
+    assert session_rows(after) == 1
+
+
+def test_logout_rotates_session_id(client):
+    client.post('/login', data={"username": "admin", "password": "admin123"})
+    logged_in = client.get_cookie('session').value
+
+    client.get('/logout')
+    cookie = client.get_cookie('session')
+    assert cookie is None or cookie.value != logged_in
+    assert session_rows(logged_in) == 0
+
+    # The old id no longer authenticates
+    client.set_cookie('session', logged_in)
+    assert client.get('/admin').status_code == 302
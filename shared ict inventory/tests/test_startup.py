@@ -0,0 +1,93 @@
+"""Startup must never wait on MongoDB: import stays within budget and /readyz reports the outage"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import APP_DIR, UNREACHABLE_MONGO_URI
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
+# Only imported inside the export/import handlers that need them
+LAZY_MODULES = ["pandas", "numpy", "openpyxl", "pyarrow", "requests"]
+
+# Runs in a fresh interpreter so the import is cold
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - started
+client = app.app.test_client()
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "healthz": client.get('/healthz').status_code,
+    "readyz": client.get('/readyz').status_code,
+    "loaded": sorted(name for name in %r if name in sys.modules),
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_probe(code):
+    env = dict(os.environ, MONGO_URI=UNREACHABLE_MONGO_URI)
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def cold_start():
+    return run_probe(PROBE)
+
+
+def test_import_within_budget(cold_start):
+    assert cold_start["import_seconds"] < STARTUP_BUDGET_SECONDS
+
+
+def test_heavy_modules_not_imported_at_startup(cold_start):
+    assert cold_start["loaded"] == []
+
+
+def test_healthz_while_mongo_unreachable(cold_start):
+    assert cold_start["healthz"] == 200
+
+
+def test_readyz_503_while_mongo_unreachable(cold_start):
+    assert cold_start["readyz"] == 503
+
+
+class FakeAdmin:
+    def command(self, name):
+        return {"ok": 1.0}
+
+
+class FakeClient:
+    admin = FakeAdmin()
+
+
+def test_index_failure_does_not_block_readiness(monkeypatch):
+    import app
+
+    def failing_indexes():
+        raise RuntimeError("E11000 duplicate key error")
+
+    monkeypatch.setattr(app, "mongo_client", FakeClient())
+    monkeypatch.setattr(app, "ensure_inventory_indexes", lambda: None)
+    monkeypatch.setattr(app, "ensure_user_indexes", failing_indexes)
+    monkeypatch.setattr(app, "ensure_job_indexes", lambda: None)
+    monkeypatch.setitem(app.mongo_status, "ready", False)
+    monkeypatch.setitem(app.mongo_status, "indexes", False)
+
+    app.check_mongo()
+    assert app.mongo_status["ready"] is True
+    assert app.mongo_status["indexes"] is False
+    assert "E11000" in app.mongo_status["index_error"]
+    assert app.app.test_client().get('/readyz').status_code == 200
+
+    # Retried on the next check once the duplicates are gone
+    monkeypatch.setattr(app, "ensure_user_indexes", lambda: None)
+    app.check_mongo()
+    assert app.mongo_status["indexes"] is True
+    assert app.mongo_status["index_error"] is None
@@ -0,0 +1,43 @@
+"""Typed purchase date / price copies stay in sync in the app and the upload script"""
+import datetime
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "inventory.csv"
+    path.write_text(text)
+    return str(path)
+
+
+def test_upsert_unsets_stale_typed_values(uploader_db, tmp_path):
+    import upload_csv_to_firestore as uploader
+
+    path = write_csv(tmp_path, 'Serial Number,Purchase date,"Purchase\nprice (TTC)"\nA,2024-03-01,"$1,200.00"\n')
+    assert uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    assert uploader_db.ict_inventory.find_one()["_typed"] == {
+        "purchase_date": datetime.datetime(2024, 3, 1), "purchase_price": 1200.0,
+    }
+
+    path = write_csv(tmp_path, 'Serial Number,Purchase date,"Purchase\nprice (TTC)"\nA,unknown,n/a\n')
+    assert uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    assert uploader_db.ict_inventory.find_one().get("_typed", {}) == {}
+
+
+def test_backfill_drops_typed_values_that_no_longer_parse(uploader_db):
+    import upload_csv_to_firestore as uploader
+
+    uploader_db.ict_inventory.insert_one({"Purchase date": "soon", "_typed": {"purchase_date": datetime.datetime(2020, 1, 1)}})
+    assert uploader.backfill_typed_fields()
+    assert "_typed" not in uploader_db.ict_inventory.find_one()
+
+
+def test_data_accepts_purchase_ranges():
+    import app
+
+    with app.app.test_request_context():
+        app.g.role = 'admin'
+        app.g.location_permissions = {}
+        query = app.build_data_query({"purchased_from": "2024-01-01", "price_max": "500"})
+    assert query == {"$and": [
+        {"_typed.purchase_date": {"$gte": datetime.datetime(2024, 1, 1)}},
+        {"_typed.purchase_price": {"$lte": 500.0}},
+    ]}
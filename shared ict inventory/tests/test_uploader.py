@@ -0,0 +1,113 @@
+"""Upload script: upserts need a unique key on every row, and every import path types values like pandas"""
+import os
+
+import pytest
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "inventory.csv"
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_duplicate_keys_refuse_the_whole_file(uploader_db, tmp_path, capsys, parallel):
+    import upload_csv_to_firestore as uploader
+
+    path = write_csv(tmp_path, "Serial Number,Status\nA,x\nB,y\nA,w\nC,z\n")
+    if parallel:
+        assert not uploader.parallel_upload_csv_to_mongodb(path, parse_workers=1, write_workers=1, upsert_key="Serial Number")
+    else:
+        assert not uploader.upload_csv_to_mongodb(path, batch_size=2, upsert_key="Serial Number")
+    assert uploader_db.ict_inventory.count_documents({}) == 0
+    assert "'A': CSV rows 1, 3" in capsys.readouterr().out
+
+
+def test_rows_without_key_are_reported(uploader_db, tmp_path, capsys):
+    import upload_csv_to_firestore as uploader
+
+    path = write_csv(tmp_path, "Serial Number,Status\nA,x\n,y\n")
+    assert not uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    assert uploader_db.ict_inventory.count_documents({}) == 0
+    assert "1 row(s) have no 'Serial Number' (CSV rows 2)" in capsys.readouterr().out
+
+
+def test_second_identical_run_writes_nothing(uploader_db, tmp_path, capsys):
+    import upload_csv_to_firestore as uploader
+
+    path = write_csv(tmp_path, "Serial Number,Status\n" + "".join(f"S{i},ok\n" for i in range(25)))
+    assert uploader.upload_csv_to_mongodb(path, batch_size=10, upsert_key="Serial Number")
+    capsys.readouterr()
+    assert uploader.upload_csv_to_mongodb(path, batch_size=10, upsert_key="Serial Number")
+    out = capsys.readouterr().out
+    assert "Successfully wrote 0 records" in out
+    assert "Skipped 25 unchanged row(s)" in out
+    assert uploader_db.ict_inventory.count_documents({}) == 25
+
+
+
+def test_resync_restores_rows_changed_outside_the_import(uploader_db, tmp_path, capsys):
+    import upload_csv_to_firestore as uploader
+    from inventory_types import typed_update
+
+    path = write_csv(tmp_path, "Serial Number,Status\nA,ok\nB,ok\nC,ok\n")
+    assert uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    # Deleted and edited in the web app, which drops the stored hash
+    uploader_db.ict_inventory.delete_one({"Serial Number": "A"})
+    uploader_db.ict_inventory.update_one({"Serial Number": "B"}, typed_update({"Status": "broken"}))
+    capsys.readouterr()
+
+    assert uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    assert "Skipped 1 unchanged row(s)" in capsys.readouterr().out
+    statuses = {doc["Serial Number"]: doc["Status"] for doc in uploader_db.ict_inventory.find()}
+    assert statuses == {"A": "ok", "B": "ok", "C": "ok"}
+
+    # A dropped collection is fully re-imported
+    uploader_db.ict_inventory.drop()
+    assert uploader.upload_csv_to_mongodb(path, upsert_key="Serial Number")
+    assert uploader_db.ict_inventory.count_documents({}) == 3
+
+TRICKY_CSV = (
+    "Asset Tag,Serial Number,Purchase date,\"Purchase\nprice (TTC)\",Qty,In use,Notes\n"
+    "007,S1,2024-03-01,\"$1,200.00\",1,True,\n"
+    "008,S2,45313,  $-   ,,False,n/a\n"
+    "\n"
+    "A12,S3,unknown,15.5,3,TRUE,NA\n"
+    "010,S4,,1e3,4,,  spaced  \n"
+    "011,S5,\"Friday, February 14, 2025\",20,5,false,None\n"
+)
+
+
+def stored_hashes(db):
+    import upload_csv_to_firestore as uploader
+
+    return sorted(uploader.row_hash(doc) for doc in db.ict_inventory.find({}, {"_id": 0}))
+
+
+@pytest.mark.parametrize("csv_name", ["tricky", "ICT Inventory.csv"])
+def test_parallel_import_matches_pandas(uploader_db, tmp_path, csv_name):
+    import upload_csv_to_firestore as uploader
+    from conftest import APP_DIR
+
+    if csv_name == "tricky":
+        path, chunk_size = write_csv(tmp_path, TRICKY_CSV), 3
+    else:
+        path, chunk_size = os.path.join(APP_DIR, csv_name), 500
+
+    assert uploader.upload_csv_to_mongodb(path, chunk_size=chunk_size)
+    sequential = stored_hashes(uploader_db)
+    uploader_db.ict_inventory.delete_many({})
+    assert uploader.parallel_upload_csv_to_mongodb(path, chunk_size=chunk_size, parse_workers=2, write_workers=2)
+    assert stored_hashes(uploader_db) == sequential
+    assert len(sequential) > 0
+
+
+def test_web_import_types_values_like_pandas(tmp_path):
+    pd = pytest.importorskip("pandas")
+    import app
+    import upload_csv_to_firestore as uploader
+
+    path = write_csv(tmp_path, TRICKY_CSV)
+    expected = [uploader.row_hash(record) for record in pd.read_csv(path).to_dict(orient='records')]
+    job = {'progress': 0}
+    assert [uploader.row_hash(record) for record in app.iter_import_records(path, 'csv', job)] == expected
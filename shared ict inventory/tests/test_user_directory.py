@@ -0,0 +1,46 @@
+"""Roles and permissions follow user writes made by any worker, or straight in the database"""
+import pytest
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import app
+
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(app, "users_collection", db.users)
+    monkeypatch.setattr(app, "metadata_collection", db.metadata)
+    monkeypatch.setattr(app, "mongo_collection", db.ict_inventory)
+    monkeypatch.setattr(app, "user_directory", {})
+    monkeypatch.setattr(app, "user_directory_version", None)
+    return db
+
+
+def test_user_created_elsewhere_stays_logged_in(directory):
+    import app
+
+    client = app.app.test_client()
+    assert app.get_directory_user("nobody") is None
+
+    # Inserted directly, without bumping the version
+    directory.ict_inventory.insert_one({"Model": "Latitude"})
+    directory.users.insert_one({"username": "alice", "password": "pw", "role": "user"})
+    response = client.post('/login', data={"username": "alice", "password": "pw"})
+    assert response.status_code == 302
+    assert client.get('/user').status_code == 200
+
+
+def test_demotion_by_another_worker_applies_immediately(directory):
+    import app
+
+    directory.users.insert_one({"username": "bob", "password": "pw", "role": "admin"})
+    assert app.get_directory_user("bob")["role"] == "admin"
+
+    # Another worker updates the user and bumps the shared counter
+    directory.users.update_one({"username": "bob"}, {"$set": {"role": "user"}})
+    directory.metadata.update_one({"_id": "users"}, {"$inc": {"version": 1}}, upsert=True)
+    assert app.get_directory_user("bob")["role"] == "user"
+
+    directory.users.delete_one({"username": "bob"})
+    app.bump_users_version()
+    assert app.get_directory_user("bob") is None
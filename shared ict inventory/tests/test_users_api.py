@@ -0,0 +1,17 @@
+"""/api/users paging parameters"""
+import pytest
+
+
+@pytest.fixture
+def admin_client():
+    import app
+    client = app.app.test_client()
+    client.post('/login', data={"username": "admin", "password": "admin123"})
+    return client
+
+
+@pytest.mark.parametrize("limit", ["abc", "1.5", ""])
+def test_bad_limit_is_rejected(admin_client, limit):
+    response = admin_client.get('/api/users', query_string={"limit": limit})
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False